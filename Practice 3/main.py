@@ -1,7 +1,47 @@
+import json
+import platform
+import random
 from abc import ABC
-from os import getcwd
-from tkinter import Tk, Frame, Listbox, Variable, Label
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from csv import reader, writer
+from datetime import datetime
+from functools import lru_cache
+from heapq import heappop, heappush
+from itertools import chain, islice
+from mmap import ACCESS_READ, mmap
+from os import cpu_count, getcwd
+from struct import Struct
+from sys import argv, byteorder, intern
+from time import perf_counter
+from tkinter import Tk, Frame, Listbox, Label, Scrollbar, TclError
 from tkinter.ttk import Combobox
+from unittest import TestCase
+
+
+class CollationTable(dict):
+    """
+    Translation table of the letters to their sort weights.
+    Characters that are not in the table get the lowest weight.
+
+    UNKNOWN_WEIGHT - weight of the characters that are not in the table.
+    """
+    UNKNOWN_WEIGHT = chr(1)
+
+    def __init__(self, letters: str):
+        """
+        Initiates table with letters in the alphabetic order, both lower and upper case.
+
+        :param letters: letters in the alphabetic order.
+        """
+        super(CollationTable, self).__init__()
+        for position, letter in enumerate(letters):
+            self[ord(letter)] = self[ord(letter.upper())] = chr(position + 2)
+
+    def __missing__(self, key: int) -> str:
+        return self.UNKNOWN_WEIGHT
 
 
 class Alphabet:
@@ -9,8 +49,63 @@ class Alphabet:
     Represents ukrainian alphabet.
 
     LETTERS: all ukrainian letters in the alphabetic order.
+    COLLATION: translation table of the letters to the sort weights.
     """
     LETTERS = 'абвгґдеєжзиіїйклмнопрстуфхцчшщьюя'
+    COLLATION = CollationTable(LETTERS)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def sort_key(word: str) -> str:
+        """
+        Converts word to the compact key that sorts in the alphabetical order.
+        Keys are memoized by the word.
+
+        :param word: word to convert to the sort key.
+        :returns: string of the sort weights, one character per letter of the word.
+        """
+        return word.translate(Alphabet.COLLATION)
+
+    @staticmethod
+    def sort_stations(stations) -> list[str]:
+        """
+        Sorts stations in the alphabetical order.
+
+        :param stations: iterable of the station names.
+        :returns: new list of the stations in the alphabetical order.
+        """
+        return sorted(stations, key=Alphabet.sort_key)
+
+    @staticmethod
+    def insert_station(stations: list[str], station: str) -> int:
+        """
+        Inserts station into the list sorted in the alphabetical order without re-sorting it.
+
+        :param stations: list of the stations in the alphabetical order.
+        :param station: station to insert.
+        :returns: index the station was inserted at.
+        """
+        index = bisect_left(stations, Alphabet.sort_key(station), key=Alphabet.sort_key)
+        stations.insert(index, station)
+        return index
+
+    @staticmethod
+    def remove_station(stations: list[str], station: str) -> int:
+        """
+        Removes station from the list sorted in the alphabetical order without the linear search.
+
+        :param stations: list of the stations in the alphabetical order.
+        :param station: station to remove.
+        :returns: index the station was removed from, -1 if station is not in the list.
+        """
+        key = Alphabet.sort_key(station)
+        index = bisect_left(stations, key, key=Alphabet.sort_key)
+        while index < len(stations) and Alphabet.sort_key(stations[index]) == key:
+            if stations[index] == station:
+                del stations[index]
+                return index
+            index += 1
+        return -1
 
     @staticmethod
     def as_position_list(word: str) -> list[int]:
@@ -24,6 +119,86 @@ class Alphabet:
         return [Alphabet.LETTERS.index(letter.lower()) if letter.lower() in Alphabet.LETTERS else -1 for letter in word]
 
 
+def iterate_bits(mask: int):
+    """
+    Iterates over the positions of the set bits of the bitset.
+
+    :param mask: integer used as the bitset.
+    :returns: generator of the set bits positions in the ascending order.
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class StationIndex:
+    """
+    Interns names of the stations and maps them to the dense integer identifiers.
+    Names are resolved back only at the presentation boundary.
+    """
+
+    def __init__(self, stations=()):
+        """
+        Initiates index with provided stations.
+
+        names - list of the interned station names, position of the name is its identifier.
+        ids - dictionary of the identifiers by the station name.
+        """
+        self.names: list[str] = []
+        self.ids: dict[str, int] = {}
+        for station in stations:
+            self.add(station)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, station: str):
+        return station in self.ids
+
+    def add(self, station: str) -> int:
+        """
+        Adds station to the index if it is not there yet.
+
+        :param station: name of the station to add.
+        :returns: identifier of the station.
+        """
+        identifier = self.ids.get(station)
+        if identifier is None:
+            identifier = len(self.names)
+            station = intern(station)
+            self.names.append(station)
+            self.ids[station] = identifier
+        return identifier
+
+    def id_of(self, station: str) -> int:
+        """
+        Finds identifier of the station.
+
+        :param station: name of the station.
+        :returns: identifier of the station if it is in the index, -1 otherwise.
+        """
+        return self.ids.get(station, -1)
+
+    def name_of(self, identifier: int) -> str:
+        """
+        Resolves identifier of the station back to its name.
+
+        :param identifier: identifier of the station.
+        :returns: name of the station.
+        """
+        return self.names[identifier]
+
+    def names_of(self, mask: int) -> list[str]:
+        """
+        Resolves bitset of the stations back to their names.
+
+        :param mask: bitset of the station identifiers.
+        :returns: list of the station names in the order of the identifiers.
+        """
+        return [self.names[identifier] for identifier in iterate_bits(mask)]
+
+
 class PublicTransport(ABC):
     """
     Represents unit of the public transport.
@@ -53,6 +228,12 @@ class PublicTransport(ABC):
         __forward_way_set - set of the stations of the forward way.
         __backward_way_set - set of the stations of the backward way.
         __all_stations - all stations from the forward and backward ways.
+        station_index - index the transport is bound to, None if it is not bound yet.
+        forward_ids - identifiers of the forward way stations.
+        backward_ids - identifiers of the backward way stations.
+        station_mask - bitset of the identifiers of the all stations.
+        forward_positions - first position of the station in the forward way, by station identifier.
+        backward_positions - first position of the station in the backward way, by station identifier.
         """
 
         self.transport_number = -1
@@ -61,6 +242,12 @@ class PublicTransport(ABC):
         self.__forward_way_set = set()
         self.__backward_way_set = set()
         self.__all_stations = set()
+        self.station_index: StationIndex | None = None
+        self.forward_ids = array('i')
+        self.backward_ids = array('i')
+        self.station_mask = 0
+        self.forward_positions: dict[int, int] = {}
+        self.backward_positions: dict[int, int] = {}
 
     def __str__(self):
         """
@@ -136,8 +323,64 @@ class PublicTransport(ABC):
         """
         if not isinstance(another, PublicTransport):
             raise ValueError("Value another must be inherited from the PublicTransport class.")
+        if self.station_index is not None and self.station_index is another.station_index:
+            return self.station_index.names_of(self.station_mask & another.station_mask)
         return list(self.all_stations & another.all_stations)
 
+    def change_ways(self, forward_way: list[str], backward_way: list[str]):
+        """
+        Replaces ways of the transport and drops the cached sets of the stations.
+        Transport must be bound to the index again.
+
+        :param forward_way: new order of the stations in the forward way.
+        :param backward_way: new order of the stations in the backward way.
+        """
+        self.forward_way, self.backward_way = list(forward_way), list(backward_way)
+        self.__forward_way_set, self.__backward_way_set, self.__all_stations = set(), set(), set()
+
+    def bind(self, index: StationIndex):
+        """
+        Binds transport to the station index.
+        Replaces names of the stations with the interned ones and builds identifiers representation of the ways.
+
+        :param index: index of the stations to bind to.
+        :returns: same transport.
+        """
+        self.forward_way = [index.name_of(index.add(station)) for station in self.forward_way]
+        self.backward_way = [index.name_of(index.add(station)) for station in self.backward_way]
+        self.forward_ids = array('i', [index.id_of(station) for station in self.forward_way])
+        self.backward_ids = array('i', [index.id_of(station) for station in self.backward_way])
+        self.station_mask = 0
+        for identifier in (*self.forward_ids, *self.backward_ids):
+            self.station_mask |= 1 << identifier
+        self.forward_positions, self.backward_positions = {}, {}
+        for position, identifier in enumerate(self.forward_ids):
+            self.forward_positions.setdefault(identifier, position)
+        for position, identifier in enumerate(self.backward_ids):
+            self.backward_positions.setdefault(identifier, position)
+        self.station_index = index
+        return self
+
+    def stops_between(self, station_from: int, station_to: int) -> int:
+        """
+        Counts stops between two stations of the bound transport.
+        Stations on the different route-ways are connected through the terminal station.
+
+        :param station_from: identifier of the station to find route from.
+        :param station_to: identifier of the station to find route to.
+        :returns: amount of the stops between stations, -1 if any station is not on the route.
+        """
+        forward, backward = self.forward_positions, self.backward_positions
+        if station_from in forward and station_to in forward:
+            return abs(forward[station_from] - forward[station_to])
+        if station_from in backward and station_to in backward:
+            return abs(backward[station_from] - backward[station_to])
+        if station_from in forward and station_to in backward:
+            return len(self.forward_ids) - 1 - forward[station_from] + backward[station_to]
+        if station_from in backward and station_to in forward:
+            return len(self.backward_ids) - 1 - backward[station_from] + forward[station_to]
+        return -1
+
     def define_route(self, station_from: str, station_to: str) -> str:
         """
         Finds route from one station to another within his own route.
@@ -904,6 +1147,250 @@ class TrolleybusThirtyEight(PublicTransport):
         ]
 
 
+class GeneratedTransport(PublicTransport):
+    """
+    Represents public transport with the ways provided at the runtime.
+    """
+
+    def __init__(self, transport_number: int, forward_way: list[str], backward_way: list[str],
+                 transport_type: str = PublicTransport.TROLLEYBUS_TRANSPORT_TYPE):
+        """
+        Initiates public transport with provided ways.
+
+        :param transport_number: number of the public transport.
+        :param forward_way: order of the stations in the forward way.
+        :param backward_way: order of the stations in the backward way.
+        :param transport_type: type of the public transport.
+        """
+        super().__init__()
+        self.transport_number = transport_number
+        self.forward_way = forward_way
+        self.backward_way = backward_way
+        self.transport_type = transport_type
+
+    @property
+    def type(self):
+        """
+        Defines a type of the public transport.
+
+        :returns: type provided at the creation.
+        """
+        return self.transport_type
+
+
+class NetworkGenerator:
+    """
+    Generates synthetic public transport networks.
+
+    STATION_NAME - format of the shared station name.
+    LINE_STATION_NAME - format of the station name that belongs to the one line only.
+    GRID_STATION_NAME - format of the grid station name.
+    """
+    STATION_NAME = "Зупинка {0}"
+    LINE_STATION_NAME = "Зупинка {0}-{1}"
+    GRID_STATION_NAME = "Перехрестя {0}-{1}"
+
+    @classmethod
+    def random(cls, lines: int, stations: int, stops: int, overlap: float = 0.5,
+               seed: int = 0) -> list[PublicTransport]:
+        """
+        Generates lines with the random order of the stops.
+        Part of the stops of every line (overlap) is taken from the shared stations, the rest belongs to the line only.
+
+        :param lines: amount of the lines.
+        :param stations: amount of the shared stations.
+        :param stops: amount of the stops of every line.
+        :param overlap: part of the stops taken from the shared stations, between 0 and 1.
+        :param seed: seed of the random generator.
+        :raises ValueError: overlap must be between 0 and 1, shared stations are not enough for the overlap.
+        :returns: list of the public transports, backward way is reversed forward way.
+        """
+        if not 0 <= overlap <= 1:
+            raise ValueError("Overlap must be between 0 and 1.")
+        shared = round(stops * overlap)
+        if shared > stations:
+            raise ValueError(f"{stations} shared stations are not enough for the {shared} shared stops.")
+        generator = random.Random(seed)
+        transports = []
+        for line in range(lines):
+            way = [cls.STATION_NAME.format(station) for station in generator.sample(range(stations), shared)] + \
+                  [cls.LINE_STATION_NAME.format(line, stop) for stop in range(stops - shared)]
+            generator.shuffle(way)
+            transports.append(GeneratedTransport(line + 1, way, way[::-1]))
+        return transports
+
+    @classmethod
+    def grid(cls, size: int) -> list[PublicTransport]:
+        """
+        Generates lines along the rows and columns of the square grid of the stations.
+
+        :param size: amount of the stations along the grid side.
+        :returns: list of the 2 * size public transports, trams go along rows and trolleybuses along columns.
+        """
+        rows = [[cls.GRID_STATION_NAME.format(row, column) for column in range(size)] for row in range(size)]
+        return [GeneratedTransport(row + 1, rows[row], rows[row][::-1], PublicTransport.TRAM_TRANSPORT_TYPE)
+                for row in range(size)] + \
+               [GeneratedTransport(column + 1, [way[column] for way in rows], [way[column] for way in rows[::-1]])
+                for column in range(size)]
+
+
+class Itinerary:
+    """
+    Represents route as the sequence of the rides on the public transports.
+
+    RIDE - format of the one ride.
+    RIDES_SEPARATOR - separator of the rides in the text representation.
+    """
+    RIDE = "{0}: {1} → {2} ({3} зупин{4})"
+    RIDES_SEPARATOR = "; пересадка на "
+
+    def __init__(self, stations: list[str], rides: list[tuple[PublicTransport, str, str, int]]):
+        """
+        Initiates itinerary.
+
+        :param stations: all stations of the route in the order of visiting.
+        :param rides: rides of the route as (public transport, station from, station to, amount of the stops).
+        """
+        self.stations = stations
+        self.rides = rides
+
+    def __str__(self):
+        return self.RIDES_SEPARATOR.join(self.RIDE.format(str(transport), station_from, station_to,
+                                                          stops, PublicTransport.define_ending(stops))
+                                         for transport, station_from, station_to, stops in self.rides)
+
+    @property
+    def stops(self) -> int:
+        """
+        Gets amount of the stops of the whole route.
+
+        :returns: amount of the stops.
+        """
+        return len(self.stations) - 1
+
+    @property
+    def transfers(self) -> int:
+        """
+        Gets amount of the transfers between public transports.
+
+        :returns: amount of the transfers.
+        """
+        return max(len(self.rides) - 1, 0)
+
+
+class RouteCache:
+    """
+    Represents least recently used cache of the route queries.
+
+    DEFAULT_SIZE - default amount of the routes to keep.
+    REQUESTS_SIZE - amount of the most requested pairs kept when statistics of the requests is trimmed.
+    """
+    DEFAULT_SIZE = 512
+    REQUESTS_SIZE = 4096
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        """
+        Initiates cache with provided size.
+
+        hits - amount of the queries answered from the cache.
+        misses - amount of the queries that evaluated the route.
+        __routes - cached routes in the order of usage, least recently used first.
+        __requests - amount of the queries by (station_from, station_to) pair.
+        """
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.__routes = OrderedDict()
+        self.__requests = Counter()
+
+    def __str__(self):
+        return f'RouteCache: ({len(self)}/{self.size}) hits: {self.hits}, misses: {self.misses}'
+
+    def __len__(self):
+        return len(self.__routes)
+
+    def __contains__(self, key: tuple[str, str]):
+        return key in self.__routes
+
+    @property
+    def size(self) -> int:
+        """
+        Gets maximum amount of the cached routes.
+
+        :returns: maximum amount of the cached routes.
+        """
+        return self.__size
+
+    @size.setter
+    def size(self, value: int):
+        """
+        Sets maximum amount of the cached routes.
+
+        :param value: maximum amount of the cached routes.
+        :raises TypeError: size of the cache must be integer value.
+        :raises ValueError: size of the cache can not be less than zero.
+        """
+        if not isinstance(value, int):
+            raise TypeError("Size of the cache must be integer value.")
+        if value < 0:
+            raise ValueError("Size of the cache can not be less than zero.")
+        self.__size = value
+
+    def get(self, key: tuple[str, str], evaluate):
+        """
+        Gets route from the cache or evaluates and stores it.
+
+        :param key: pair of the stations (station_from, station_to).
+        :param evaluate: function to evaluate route if it is not cached.
+        :returns: cached or evaluated route.
+        """
+        self.__requests[key] += 1
+        if len(self.__requests) > 2 * self.REQUESTS_SIZE:
+            self.__requests = Counter(dict(self.__requests.most_common(self.REQUESTS_SIZE)))
+        if key in self.__routes:
+            self.hits += 1
+            self.__routes.move_to_end(key)
+            return self.__routes[key]
+        self.misses += 1
+        return self.put(key, evaluate())
+
+    def put(self, key: tuple[str, str], route):
+        """
+        Stores route in the cache and evicts the least recently used routes above the size.
+
+        :param key: pair of the stations (station_from, station_to).
+        :param route: route to store.
+        :returns: stored route.
+        """
+        self.__routes[key] = route
+        self.__routes.move_to_end(key)
+        while len(self.__routes) > self.size:
+            self.__routes.popitem(last=False)
+        return route
+
+    def invalidate(self, selector=None):
+        """
+        Removes routes from the cache.
+
+        :param selector: function that takes (station_from, station_to) pair and defines whether to remove route.
+                         All routes are removed if selector is not set.
+        """
+        if selector is None:
+            self.__routes.clear()
+            return
+        for key in [key for key in self.__routes if selector(key)]:
+            del self.__routes[key]
+
+    def popular(self, amount: int) -> list[tuple[str, str]]:
+        """
+        Gets the most requested pairs of the stations.
+
+        :param amount: amount of the pairs to get.
+        :returns: list of the (station_from, station_to) pairs, the most requested first.
+        """
+        return [key for key, _ in self.__requests.most_common(amount)]
+
+
 class RouteManager:
     """
     Represents manager of the public transport.
@@ -915,19 +1402,38 @@ class RouteManager:
     ONE_CROSS_ROUTE = PublicTransport.SIT_ON_STATION + "проїдьте {2} зупин{3} та на зупинці {4} пересядьте на {5} " \
                                                        "та проїдьте {6} зупин{7} до станції {8}"
     ENDINGS = {tuple([1]): "ний засіб", (2, 3, 4): "ні засоби", (5, 6, 7, 8, 9, 0): "их засобів"}
+    POPULAR_ROUTES = [("Залізничний вокзал", "Площа Ринок"),
+                      ("Площа Ринок", "Залізничний вокзал"),
+                      ("Залізничний вокзал", "Львівська політехніка"),
+                      ("Львівська політехніка", "Площа Ринок"),
+                      ("Головна Пошта", "Погулянка"),
+                      ("Приміський вокзал", "Університет")]
 
-    def __init__(self):
+    def __init__(self, cache_size: int = RouteCache.DEFAULT_SIZE, public_transport: list[PublicTransport] = None):
         """
         Initiates RoutManager.
 
+        :param cache_size: maximum amount of the cached routes.
+        :param public_transport: public transports of the network, Lviv routes by default.
+
         public_transport - list of the all available public transports.
+        station_index - interned stations with identifiers given in the alphabetical order.
         all_stations - list of the all stations, based on public_transport list
                      - unique, sorted in alphabetical order.
+        station_lines - bitsets of the public_transport indexes that have a stop at the station, by station identifier.
         all_transport_numbers - list of all the public transports rout numbers.
         station_cross - dictionary of the common stations between all public transports.
+        line_cross - bitsets of the overlapping public_transport indexes, by public_transport index.
+        transfer_stations - identifiers of the common stations, by pair of the overlapping public_transport indexes.
+        lines - index of the public transport in the public_transport list, by public transport.
+        route_cache - cache of the find_route queries.
+        station_graph - public_transport indexes bitsets by the next station identifier, by station identifier.
+        reachability_cache - results of the reachability queries, by station identifier.
+        suspended - original ways of the suspended public transports, by public_transport index.
+        listeners - functions invoked without arguments after the public transport way was changed.
         transports - list of the string representations of the public transport list.
         """
-        self.public_transport = [
+        self.public_transport = public_transport if public_transport is not None else [
             TramOne(),
             TramTwo(),
             TramThree(),
@@ -946,29 +1452,254 @@ class RouteManager:
             TrolleybusThirtyThree(),
             TrolleybusThirtyEight()
         ]
-        self.all_stations = sorted(list(set.union(*[transport.all_stations for transport in self.public_transport])),
-                                   key=Alphabet.as_position_list)
+        self.station_index = StationIndex(Alphabet.sort_stations(set.union(*[transport.all_stations
+                                                                             for transport in self.public_transport])))
+        self.all_stations = list(self.station_index.names)
+        self.station_lines = [0] * len(self.station_index)
+        for line, transport in enumerate(self.public_transport):
+            for identifier in iterate_bits(transport.bind(self.station_index).station_mask):
+                self.station_lines[identifier] |= 1 << line
         self.all_transport_numbers = [transport.transport_number for transport in self.public_transport]
         self.station_cross = dict()
+        self.line_cross: list[int] = []
+        self.transfer_stations: dict[tuple[int, int], array] = {}
         self.transports = [str(transport) for transport in self.public_transport]
+        self.lines = {transport: line for line, transport in enumerate(self.public_transport)}
+        self.route_cache = RouteCache(cache_size)
+        self.station_graph: list[dict[int, int]] = []
+        self.reachability_cache: dict[int, dict[str, tuple[int, int]]] = {}
+        self.suspended: dict[int, tuple[list[str], list[str]]] = {}
+        self.listeners = []
         self.init_station_cross()
+        self.init_station_graph()
 
     def init_station_cross(self):
         """
         Gather information about intersection between all public transport.
+        Overlapping lines are found at once from the station×line incidence bitsets,
+        common stations are computed only for the pairs that do overlap.
         """
-        for i, transport in enumerate(self.public_transport):
-            for j, another in enumerate(self.public_transport):
-                if i == j:
-                    continue
-                if transport not in self.station_cross:
-                    self.station_cross[transport] = {}
-                common_stations = transport.common_station_with(another)
-                if not common_stations:
+        self.line_cross = []
+        for line, transport in enumerate(self.public_transport):
+            overlap = 0
+            for identifier in iterate_bits(transport.station_mask):
+                overlap |= self.station_lines[identifier]
+            self.line_cross.append(overlap & ~(1 << line))
+
+        self.station_cross = {transport: {} for transport in self.public_transport}
+        self.transfer_stations = {}
+        for line in range(len(self.public_transport)):
+            for another_line in iterate_bits(self.line_cross[line]):
+                self.link_lines(line, another_line)
+
+    def link_lines(self, line: int, another_line: int):
+        """
+        Stores common stations of the overlapping public transports.
+
+        :param line: index of the public transport.
+        :param another_line: index of another public transport.
+        """
+        transport, another = self.public_transport[line], self.public_transport[another_line]
+        common_stations = transport.station_mask & another.station_mask
+        self.transfer_stations[line, another_line] = array('i', iterate_bits(common_stations))
+        self.station_cross[transport][another] = self.station_index.names_of(common_stations)
+
+    def unlink_lines(self, line: int, another_line: int):
+        """
+        Removes common stations of the public transports that do not overlap anymore.
+
+        :param line: index of the public transport.
+        :param another_line: index of another public transport.
+        """
+        self.transfer_stations.pop((line, another_line), None)
+        self.station_cross[self.public_transport[line]].pop(self.public_transport[another_line], None)
+
+    def init_station_graph(self):
+        """
+        Gather information about stations that follow each other on any public transport way.
+        """
+        self.station_graph = [{} for _ in range(len(self.station_index))]
+        for line in range(len(self.public_transport)):
+            self.link_stations(line)
+
+    def link_stations(self, line: int, ways: tuple = None, link: bool = True):
+        """
+        Adds or removes public transport from the station_graph edges.
+
+        :param line: index of the public transport.
+        :param ways: ways of the station identifiers, current ways of the public transport by default.
+        :param link: True - to add public transport to the edges, False - to remove it.
+        """
+        transport, bit = self.public_transport[line], 1 << line
+        for way in ways if ways is not None else (transport.forward_ids, transport.backward_ids):
+            for current, following in zip(way, way[1:]):
+                if current == following:
                     continue
-                if another not in self.station_cross[transport]:
-                    self.station_cross[transport][another] = []
-                self.station_cross[transport][another] += common_stations
+                lines = self.station_graph[current].get(following, 0)
+                lines = lines | bit if link else lines & ~bit
+                if lines:
+                    self.station_graph[current][following] = lines
+                else:
+                    self.station_graph[current].pop(following, None)
+
+    def update_line(self, transport: PublicTransport, forward_way: list[str], backward_way: list[str]):
+        """
+        Changes ways of the public transport and patches only the structures it affects:
+        station bitsets, overlaps with another public transports, station_graph edges and cached routes.
+        Listeners are notified after the update.
+
+        :param transport: public transport of the network to change.
+        :param forward_way: new order of the stations in the forward way.
+        :param backward_way: new order of the stations in the backward way.
+        """
+        line, bit = self.lines[transport], 1 << self.lines[transport]
+        old_mask, old_ways = transport.station_mask, (transport.forward_ids, transport.backward_ids)
+        for station in (*forward_way, *backward_way):
+            if station not in self.station_index:
+                self.station_index.add(station)
+                self.station_lines.append(0)
+                self.station_graph.append({})
+
+        self.link_stations(line, old_ways, link=False)
+        transport.change_ways(forward_way, backward_way)
+        new_mask = transport.bind(self.station_index).station_mask
+        self.link_stations(line)
+
+        for identifier in iterate_bits(old_mask & ~new_mask):
+            self.station_lines[identifier] &= ~bit
+            if not self.station_lines[identifier]:
+                Alphabet.remove_station(self.all_stations, self.station_index.name_of(identifier))
+        for identifier in iterate_bits(new_mask & ~old_mask):
+            if not self.station_lines[identifier]:
+                Alphabet.insert_station(self.all_stations, self.station_index.name_of(identifier))
+            self.station_lines[identifier] |= bit
+
+        overlap = 0
+        for identifier in iterate_bits(new_mask):
+            overlap |= self.station_lines[identifier]
+        overlap &= ~bit
+        for another_line in iterate_bits(self.line_cross[line] & ~overlap):
+            self.line_cross[another_line] &= ~bit
+            self.unlink_lines(line, another_line)
+            self.unlink_lines(another_line, line)
+        for another_line in iterate_bits(overlap):
+            self.line_cross[another_line] |= bit
+            self.link_lines(line, another_line)
+            self.link_lines(another_line, line)
+        self.line_cross[line] = overlap
+
+        affected = set(self.station_index.names_of(old_mask | new_mask))
+        self.route_cache.invalidate(lambda key: key[0] in affected or key[1] in affected)
+        for origin in [origin for origin, reachable in self.reachability_cache.items()
+                       if self.station_index.name_of(origin) in affected or not affected.isdisjoint(reachable)]:
+            del self.reachability_cache[origin]
+        for listener in self.listeners:
+            listener()
+
+    def transport_named(self, transport_name: str) -> PublicTransport:
+        """
+        Finds transport to update.
+
+        :param transport_name: name of the transport to find.
+        :raises ValueError: transport is not found.
+        :returns: public transport with the transport_name.
+        """
+        transport = self.find_transport(transport_name)
+        if transport is None:
+            raise ValueError(f"Public transport {transport_name} is not found.")
+        return transport
+
+    def remove_station(self, station: str, transport_name: str = None):
+        """
+        Closes station for the public transport or for all public transports going through it.
+
+        :param station: station to close.
+        :param transport_name: name of the public transport, all public transports by default.
+        """
+        transports = [self.transport_named(transport_name)] if transport_name else self.has_stop_in(station)
+        for transport in transports:
+            self.update_line(transport,
+                             [stop for stop in transport.forward_way if stop != station],
+                             [stop for stop in transport.backward_way if stop != station])
+
+    def insert_detour(self, transport_name: str, station_from: str, station_to: str, detour: list[str]):
+        """
+        Replaces the part of the public transport ways between two stations with the detour.
+        Forward way goes through the detour from station_from to station_to, backward way - in the reversed order.
+
+        :param transport_name: name of the public transport.
+        :param station_from: station the detour starts at.
+        :param station_to: station the detour ends at.
+        :param detour: stations of the detour between station_from and station_to.
+        :raises ValueError: transport is not found or it does not go from station_from to station_to on any way.
+        """
+        transport = self.transport_named(transport_name)
+        forward_way = self.replace_part(transport.forward_way, station_from, station_to, detour)
+        backward_way = self.replace_part(transport.backward_way, station_to, station_from, detour[::-1])
+        if forward_way is None and backward_way is None:
+            raise ValueError(f"{transport_name} does not go from {station_from} to {station_to}.")
+        self.update_line(transport,
+                         transport.forward_way if forward_way is None else forward_way,
+                         transport.backward_way if backward_way is None else backward_way)
+
+    @staticmethod
+    def replace_part(way: list[str], station_from: str, station_to: str, part: list[str]) -> list[str] | None:
+        """
+        Replaces stations of the way between two stations.
+
+        :param way: order of the stations.
+        :param station_from: station the part starts after.
+        :param station_to: station the part ends before.
+        :param part: stations to put between station_from and station_to.
+        :returns: new order of the stations, None if way does not go from station_from to station_to.
+        """
+        if station_from not in way or station_to not in way[way.index(station_from) + 1:]:
+            return None
+        start = way.index(station_from)
+        end = way.index(station_to, start + 1)
+        return way[:start + 1] + list(part) + way[end:]
+
+    def suspend_line(self, transport_name: str):
+        """
+        Suspends public transport, it keeps its place in the list, but has no stations.
+
+        :param transport_name: name of the public transport.
+        """
+        transport = self.transport_named(transport_name)
+        if self.lines[transport] in self.suspended:
+            return
+        self.suspended[self.lines[transport]] = (transport.forward_way, transport.backward_way)
+        self.update_line(transport, [], [])
+
+    def resume_line(self, transport_name: str):
+        """
+        Restores ways of the suspended public transport.
+
+        :param transport_name: name of the public transport.
+        """
+        transport = self.transport_named(transport_name)
+        if self.lines[transport] in self.suspended:
+            self.update_line(transport, *self.suspended.pop(self.lines[transport]))
+
+    def best_transfer(self, line_from: int, line_to: int, station_from: int, station_to: int) -> tuple[int, int, int]:
+        """
+        Chooses common station of two public transports that minimises total amount of the stops.
+
+        :param line_from: index of the public transport to start route with.
+        :param line_to: index of the public transport to finish route with.
+        :param station_from: identifier of the station to find route from.
+        :param station_to: identifier of the station to find route to.
+        :returns: identifier of the transfer station and amounts of the stops before and after it.
+                  (-1, -1, -1) - if public transports do not overlap.
+        """
+        transport_from, transport_to = self.public_transport[line_from], self.public_transport[line_to]
+        best = (-1, -1, -1)
+        for transfer in self.transfer_stations.get((line_from, line_to), ()):
+            first = transport_from.stops_between(station_from, transfer)
+            second = transport_to.stops_between(transfer, station_to)
+            if best[0] < 0 or first + second < best[1] + best[2]:
+                best = (transfer, first, second)
+        return best
 
     @classmethod
     def same_transport_route(cls, station_from: str, station_to: str, routes: list[PublicTransport]) -> list[str]:
@@ -989,7 +1720,17 @@ class RouteManager:
         :param station: station to find routes going through.
         :returns: list of all public transports.
         """
-        return [transport for transport in self.public_transport if station in transport.all_stations]
+        return self.transports_of(self.lines_through(station))
+
+    def lines_through(self, station: str) -> int:
+        """
+        Finds all public transports that has route through the station as the bitset.
+
+        :param station: station to find routes going through.
+        :returns: bitset of the public_transport indexes, 0 if station is not found.
+        """
+        identifier = self.station_index.id_of(station)
+        return self.station_lines[identifier] if identifier >= 0 else 0
 
     def has_stops_in(self, *stations: str) -> list[list[PublicTransport]]:
         """
@@ -1003,23 +1744,233 @@ class RouteManager:
     def find_route(self, station_from: str, station_to: str) -> str | list[str]:
         """
         Finds route from one station to another.
+        Routes are kept in the route_cache.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        """
+        route = self.route_cache.get((station_from, station_to),
+                                     lambda: self.evaluate_route(station_from, station_to))
+        return list(route) if isinstance(route, list) else route
+
+    def warm_up(self, pairs: list[tuple[str, str]] = None):
+        """
+        Evaluates routes ahead and stores them in the route_cache.
+
+        :param pairs: pairs of the stations (station_from, station_to), by default - the most requested pairs
+                      or POPULAR_ROUTES if there were no requests yet.
+        """
+        if pairs is None:
+            pairs = self.route_cache.popular(self.route_cache.size) or self.POPULAR_ROUTES
+        for station_from, station_to in pairs:
+            if (station_from, station_to) not in self.route_cache:
+                self.route_cache.put((station_from, station_to), self.evaluate_route(station_from, station_to))
+
+    def network_changed(self):
+        """
+        Notifies manager that public transport network was changed.
+        Removes all cached routes.
+        """
+        self.route_cache.invalidate()
+        self.reachability_cache.clear()
+
+    def reachability(self, station: str, cache: bool = True) -> dict[str, tuple[int, int]]:
+        """
+        Finds minimum amount of the stops and transfers to every station reachable from the station.
+        Stops are counted with the one sweep over the station_graph, transfers - with the one sweep over line_cross.
+        Stops and transfers are minimised independently, so the pair may not be achievable with the one route.
+        Results are cached by the station, the caller gets a copy.
+
+        :param station: station to find routes from.
+        :param cache: False - result is neither taken from nor stored in the reachability_cache.
+        :returns: (stops, transfers) pairs by the name of the reachable station, empty if station is not found.
+        """
+        origin = self.station_index.id_of(station)
+        if origin < 0:
+            return {}
+        if cache and origin in self.reachability_cache:
+            return dict(self.reachability_cache[origin])
+
+        stops, transfers, _ = self.sweep(origin)
+        result = {self.station_index.name_of(identifier): (stop, transfers[identifier])
+                  for identifier, stop in enumerate(stops) if stop >= 0}
+        if cache:
+            self.reachability_cache[origin] = result
+            return dict(result)
+        return result
+
+    def sweep(self, origin: int) -> tuple[array, array, array]:
+        """
+        Finds minimum amount of the stops, transfers and the next station towards every station from the origin.
+
+        :param origin: identifier of the station to find routes from.
+        :returns: arrays of the stops, transfers and next station identifiers by station identifier,
+                  -1 for the unreachable stations.
+        """
+        stops = array('i', [-1]) * len(self.station_index)
+        next_stations = array('i', [-1]) * len(self.station_index)
+        stops[origin], next_stations[origin] = 0, origin
+        queue = deque([origin])
+        while queue:
+            current = queue.popleft()
+            for following in self.station_graph[current]:
+                if stops[following] < 0:
+                    stops[following] = stops[current] + 1
+                    next_stations[following] = following if current == origin else next_stations[current]
+                    queue.append(following)
+
+        line_transfers = array('i', [-1]) * len(self.public_transport)
+        boarded, visited, transfer = self.station_lines[origin], 0, 0
+        while boarded:
+            visited |= boarded
+            reached = 0
+            for line in iterate_bits(boarded):
+                line_transfers[line] = transfer
+                reached |= self.line_cross[line]
+            boarded, transfer = reached & ~visited, transfer + 1
+
+        transfers = array('i', [-1]) * len(self.station_index)
+        for identifier, stop in enumerate(stops):
+            if stop >= 0:
+                transfers[identifier] = 0 if identifier == origin else \
+                    min((line_transfers[line] for line in iterate_bits(self.station_lines[identifier])
+                         if line_transfers[line] >= 0), default=-1)
+        return stops, transfers, next_stations
+
+    def k_shortest_routes(self, station_from: str, station_to: str, amount: int = 3) -> list[Itinerary]:
+        """
+        Finds up to amount of the shortest loopless routes between stations (Yen's algorithm).
+        Routes are ranked by amount of the stops, then by amount of the transfers.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        :param amount: maximum amount of the routes to find.
+        :returns: list of the itineraries, the shortest first.
+        """
+        source, target = self.station_index.id_of(station_from), self.station_index.id_of(station_to)
+        if source < 0 or target < 0 or amount <= 0:
+            return []
+        first = self.shortest_path(source, target, set(), set())
+        if first is None:
+            return []
+
+        found, candidates, seen = [first], [], {tuple(first)}
+        while len(found) < amount:
+            previous = found[-1]
+            for spur_index in range(len(previous) - 1):
+                root = previous[:spur_index + 1]
+                removed_edges = {(path[spur_index], path[spur_index + 1]) for path in found
+                                 if len(path) > spur_index + 1 and path[:spur_index + 1] == root}
+                spur = self.shortest_path(root[-1], target, removed_edges, set(root[:-1]))
+                if spur is None or tuple(root[:-1] + spur) in seen:
+                    continue
+                path = root[:-1] + spur
+                seen.add(tuple(path))
+                heappush(candidates, (len(path), self.count_rides(path), path))
+            if not candidates:
+                break
+            found.append(heappop(candidates)[2])
+        return [self.as_itinerary(path) for path in found]
+
+    def shortest_path(self, source: int, target: int,
+                      removed_edges: set[tuple[int, int]], removed_stations: set[int]) -> list[int] | None:
+        """
+        Finds path with the minimum amount of the stops over the station_graph.
+
+        :param source: identifier of the station to find path from.
+        :param target: identifier of the station to find path to.
+        :param removed_edges: pairs of the station identifiers that can not be used.
+        :param removed_stations: identifiers of the stations that can not be visited.
+        :returns: identifiers of the stations of the path, None if there is no path.
+        """
+        parents = {source: -1}
+        queue = deque([source])
+        while queue and target not in parents:
+            current = queue.popleft()
+            for following in self.station_graph[current]:
+                if following in parents or following in removed_stations or (current, following) in removed_edges:
+                    continue
+                parents[following] = current
+                queue.append(following)
+        if target not in parents:
+            return None
+        path = [target]
+        while parents[path[-1]] >= 0:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+    def split_rides(self, path: list[int]) -> list[tuple[int, int, int]]:
+        """
+        Splits path to the rides with the minimum amount of the transfers.
+        Each ride continues on the public transport as long as it is possible.
+
+        :param path: identifiers of the stations of the path.
+        :returns: list of the (public_transport index, start position, end position) in the path.
+        """
+        rides, start, lines = [], 0, 0
+        for position in range(len(path) - 1):
+            edge = self.station_graph[path[position]][path[position + 1]]
+            if lines & edge:
+                lines &= edge
+                continue
+            if lines:
+                rides.append(((lines & -lines).bit_length() - 1, start, position))
+            start, lines = position, edge
+        if lines:
+            rides.append(((lines & -lines).bit_length() - 1, start, len(path) - 1))
+        return rides
+
+    def count_rides(self, path: list[int]) -> int:
+        """
+        Counts rides of the path.
+
+        :param path: identifiers of the stations of the path.
+        :returns: amount of the rides with the minimum amount of the transfers.
+        """
+        return len(self.split_rides(path))
+
+    def as_itinerary(self, path: list[int]) -> Itinerary:
+        """
+        Converts path to the itinerary.
+
+        :param path: identifiers of the stations of the path.
+        :returns: itinerary with the names of the stations and rides.
+        """
+        return Itinerary([self.station_index.name_of(identifier) for identifier in path],
+                         [(self.public_transport[line],
+                           self.station_index.name_of(path[start]),
+                           self.station_index.name_of(path[end]),
+                           end - start)
+                          for line, start, end in self.split_rides(path)])
+
+    def evaluate_route(self, station_from: str, station_to: str) -> str | list[str]:
+        """
+        Evaluates route from one station to another without the route_cache.
 
         :param station_from: station to find route from.
         :param station_to: station to find route to.
         """
-        transports_at_station_from, transports_at_station_to = map(set, self.has_stops_in(station_from, station_to))
-        if not transports_at_station_from:
+        lines_from, lines_to = self.lines_through(station_from), self.lines_through(station_to)
+        if not lines_from:
             return self.STATION_NOT_FOUND.format(station_from)
-        if not transports_at_station_to:
+        if not lines_to:
             return self.STATION_NOT_FOUND.format(station_to)
 
-        common_public_transport = list(transports_at_station_from & transports_at_station_to)
-        if common_public_transport:
-            return self.same_transport_route(station_from, station_to, common_public_transport)
+        if lines_from & lines_to:
+            return self.same_transport_route(station_from, station_to, self.transports_of(lines_from & lines_to))
 
         return self.intersected_route(station_from, station_to,
-                                      transports_at_station_from,
-                                      transports_at_station_to)
+                                      set(self.transports_of(lines_from)),
+                                      set(self.transports_of(lines_to)))
+
+    def transports_of(self, mask: int) -> list[PublicTransport]:
+        """
+        Resolves bitset of the public_transport indexes back to the public transports.
+
+        :param mask: bitset of the public_transport indexes.
+        :returns: list of the public transports.
+        """
+        return [self.public_transport[line] for line in iterate_bits(mask)]
 
     def intersected_route(self, station_from: str, station_to: str,
                           transports_from: set[PublicTransport],
@@ -1033,22 +1984,21 @@ class RouteManager:
         :param transports_from: set of the transport that has a stop at the station_to.
         :returns: formatted info about ways to get from one station to another.
         """
-        one_cross = [(transport_from, transport_to, self.station_cross[transport_from][transport_to])
+        identifier_from, identifier_to = self.station_index.id_of(station_from), self.station_index.id_of(station_to)
+        one_cross = [(transport_from, transport_to, self.best_transfer(self.lines[transport_from],
+                                                                       self.lines[transport_to],
+                                                                       identifier_from, identifier_to))
                      for transport_from in transports_from
                      for transport_to in transports_to
                      if transport_to in self.station_cross[transport_from]]
         if not one_cross:
             return None
-        return [self.ONE_CROSS_ROUTE.format(station_from, str(info[0]),
-                                            info[0].get_station_difference(station_from, info[2][0]),
-                                            info[0].define_ending(info[0].get_station_difference(station_from,
-                                                                                                 info[2][0])),
-                                            info[2][0], str(info[1]),
-                                            info[1].get_station_difference(info[2][0], station_to),
-                                            info[1].define_ending(info[1].get_station_difference(info[2][0],
-                                                                                                 station_to)),
+        return [self.ONE_CROSS_ROUTE.format(station_from, str(transport_from),
+                                            first, transport_from.define_ending(first),
+                                            self.station_index.name_of(transfer), str(transport_to),
+                                            second, transport_to.define_ending(second),
                                             station_to)
-                for info in one_cross]
+                for transport_from, transport_to, (transfer, first, second) in one_cross]
 
     def find_transport(self, transport_name: str) -> PublicTransport | None:
         """
@@ -1095,6 +2045,818 @@ class RouteManager:
                                                        if number % 10 in key][0]
 
 
+class VirtualListbox(Frame):
+    """
+    Listbox that renders only the visible window of its items.
+    Provides the same selection access as Listbox: curselection, get and select_set.
+
+    WHEEL_DELTA - mouse wheel delta of the one scroll step.
+    WHEEL_UNITS - amount of the rows scrolled by the one wheel step.
+    """
+    WHEEL_DELTA = 120
+    WHEEL_UNITS = 3
+
+    def __init__(self, master=None, items=(), height: int = 10, **options):
+        """
+        Initiates listbox with provided items.
+
+        items - all items of the listbox.
+        offset - index of the first visible item.
+        selected - index of the selected item, -1 if nothing is selected.
+        listbox - listbox that displays visible items.
+        scrollbar - scrollbar over all items.
+
+        :param master: parent widget.
+        :param items: items to display.
+        :param height: amount of the visible rows.
+        :param options: options of the Listbox.
+        """
+        super(VirtualListbox, self).__init__(master, bg=options.get('bg'))
+        self.items = list(items)
+        self.offset = 0
+        self.selected = -1
+        self.listbox = Listbox(self, height=height, **options)
+        self.scrollbar = Scrollbar(self, orient="vertical", command=self.on_scroll)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-event.delta // self.WHEEL_DELTA
+                                                                    * self.WHEEL_UNITS))
+        self.listbox.bind("<Button-4>", lambda _: self.scroll(-self.WHEEL_UNITS))
+        self.listbox.bind("<Button-5>", lambda _: self.scroll(self.WHEEL_UNITS))
+        self.listbox.pack(side="left")
+        self.scrollbar.pack(side="right", fill="y")
+        self.render()
+
+    @property
+    def height(self) -> int:
+        """
+        Gets amount of the visible rows.
+
+        :returns: height of the listbox.
+        """
+        return int(self.listbox.cget("height"))
+
+    def set_items(self, items):
+        """
+        Replaces items of the listbox and scrolls to the top.
+
+        :param items: items to display.
+        """
+        self.items = list(items)
+        self.offset = 0
+        self.selected = -1
+        self.render()
+
+    def bind_select(self, handler):
+        """
+        Binds handler to the selection change.
+
+        :param handler: function to invoke with the event.
+        """
+        self.listbox.bind("<<ListboxSelect>>", handler, add="+")
+
+    def curselection(self) -> tuple:
+        """
+        Gets selected index among all items.
+
+        :returns: tuple with the selected index, empty if nothing is selected.
+        """
+        return (self.selected,) if self.selected >= 0 else ()
+
+    def get(self, index: int):
+        """
+        Gets item at the index among all items.
+
+        :param index: index of the item.
+        :returns: item of the listbox.
+        """
+        return self.items[index]
+
+    def select_set(self, index: int):
+        """
+        Selects item at the index and scrolls to it.
+
+        :param index: index of the item to select, -1 to clear selection.
+        """
+        self.selected = index if 0 <= index < len(self.items) else -1
+        if self.selected >= 0 and not self.offset <= self.selected < self.offset + self.height:
+            self.offset = self.selected
+        self.render()
+
+    def scroll(self, rows: int):
+        """
+        Moves visible window.
+
+        :param rows: amount of the rows to scroll, negative values scroll up.
+        """
+        self.offset += rows
+        self.render()
+
+    def on_scroll(self, action: str, value: str, units: str = "units"):
+        """
+        Scrollbar command handler.
+
+        :param action: 'moveto' or 'scroll'.
+        :param value: fraction of the list for 'moveto', amount of the steps for 'scroll'.
+        :param units: 'units' or 'pages' for 'scroll'.
+        """
+        if action == "moveto":
+            self.offset = int(float(value) * len(self.items))
+            self.render()
+            return
+        self.scroll(int(value) * (self.height if units == "pages" else 1))
+
+    def on_select(self, _):
+        """
+        Selection of the visible item event handler.
+        Translates index of the visible row to the index among all items.
+        """
+        indexes = self.listbox.curselection()
+        self.selected = self.offset + indexes[0] if indexes else -1
+
+    def render(self):
+        """
+        Displays visible window of the items and updates scrollbar.
+        """
+        height, total = self.height, len(self.items)
+        self.offset = max(0, min(self.offset, total - height))
+        self.listbox.delete(0, "end")
+        self.listbox.insert("end", *self.items[self.offset:self.offset + height])
+        if self.offset <= self.selected < self.offset + height:
+            self.listbox.selection_set(self.selected - self.offset)
+        self.scrollbar.set(self.offset / total if total else 0, (self.offset + height) / total if total else 1)
+
+
+class DistanceTable:
+    """
+    Precomputed all-pairs table of the minimum stops, transfers and next stations of the public transport network.
+    Tables are built offline, saved in the compact binary format and memory-mapped for the O(1) queries.
+
+    File format: header (MAGIC, byte order, amount of the stations n),
+    three n×n uint16 matrices - stops, transfers, next stations, names of the stations separated by the new line.
+
+    MAGIC - signature of the file.
+    HEADER - layout of the file header.
+    UNREACHABLE - value of the matrices cell for the unreachable stations.
+    FILE_SOURCE - default file to save the table to.
+    worker_manager - manager of the network the rows are evaluated for in the current process.
+    """
+    MAGIC = b'APDT'
+    HEADER = Struct('<4scI')
+    UNREACHABLE = 0xFFFF
+    FILE_SOURCE = 'distances.bin'
+    worker_manager = None
+
+    def __init__(self, stations: list[str], stops, transfers, next_stations, source: mmap | None = None):
+        """
+        Initiates table.
+
+        stations - names of the stations in the order of the matrices.
+        ids - identifiers of the stations by the name.
+        stops, transfers, next_stations - flat n×n uint16 matrices, row is the station to find route from.
+        source - memory-mapped file of the table, None if table is in memory.
+        """
+        self.stations = stations
+        self.ids = {station: identifier for identifier, station in enumerate(stations)}
+        self.stops = stops
+        self.transfers = transfers
+        self.next_stations = next_stations
+        self.source = source
+
+    def __len__(self):
+        return len(self.stations)
+
+    @classmethod
+    def build(cls, manager: RouteManager, processes: int = None):
+        """
+        Builds table with the BFS from every station, rows are evaluated in parallel across processes.
+
+        :param manager: manager of the network to build table for.
+        :param processes: amount of the worker processes, amount of the cpu cores by default, 1 - no workers.
+        :raises ValueError: network has too many stations for the uint16 matrices.
+        :returns: table in memory.
+        """
+        size = len(manager.station_index)
+        if size >= cls.UNREACHABLE:
+            raise ValueError(f'Network can not have more than {cls.UNREACHABLE - 1} stations.')
+        stops, transfers, next_stations = (array('H', [cls.UNREACHABLE]) * (size * size) for _ in range(3))
+
+        def fill(rows):
+            for origin, row in enumerate(rows):
+                for matrix, values in zip((stops, transfers, next_stations), row):
+                    matrix[origin * size:(origin + 1) * size] = values
+
+        processes = processes or cpu_count() or 1
+        if processes == 1:
+            cls.init_worker(manager)
+            fill(map(cls.build_row, range(size)))
+        else:
+            with ProcessPoolExecutor(processes, initializer=cls.init_worker, initargs=(manager,)) as executor:
+                fill(executor.map(cls.build_row, range(size), chunksize=max(1, size // (processes * 4))))
+        return cls(list(manager.station_index.names), stops, transfers, next_stations)
+
+    @classmethod
+    def init_worker(cls, manager: RouteManager):
+        """
+        Sets manager of the network for the rows evaluation in the current process.
+
+        :param manager: manager of the network.
+        """
+        cls.worker_manager = manager
+
+    @classmethod
+    def build_row(cls, origin: int) -> tuple[array, array, array]:
+        """
+        Evaluates rows of the matrices for the one station.
+
+        :param origin: identifier of the station to find routes from.
+        :returns: rows of the stops, transfers and next stations matrices.
+        """
+        return tuple(array('H', [value if value >= 0 else cls.UNREACHABLE for value in values])
+                     for values in cls.worker_manager.sweep(origin))
+
+    def save(self, path: str = FILE_SOURCE):
+        """
+        Saves table to the file.
+
+        :param path: file to save table to.
+        """
+        with open(path, 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, byteorder[0].encode(), len(self)))
+            for matrix in self.stops, self.transfers, self.next_stations:
+                file.write(bytes(matrix))
+            file.write('\n'.join(self.stations).encode('utf-8'))
+
+    @classmethod
+    def open(cls, path: str = FILE_SOURCE):
+        """
+        Opens table saved to the file without reading matrices into memory.
+
+        :param path: file to open table from.
+        :raises ValueError: file is not a table or was saved with another byte order.
+        :returns: memory-mapped table.
+        """
+        with open(path, 'rb') as file:
+            source = mmap(file.fileno(), 0, access=ACCESS_READ)
+        magic, byte_order, size = cls.HEADER.unpack_from(source)
+        if magic != cls.MAGIC or byte_order != byteorder[0].encode():
+            source.close()
+            raise ValueError(f'File {path} is not a distance table of this platform.')
+        view, matrix_size = memoryview(source), size * size * 2
+        matrices = [view[cls.HEADER.size + index * matrix_size:cls.HEADER.size + (index + 1) * matrix_size].cast('H')
+                    for index in range(3)]
+        stations = bytes(view[cls.HEADER.size + 3 * matrix_size:]).decode('utf-8').split('\n') if size else []
+        return cls(stations, *matrices, source=source)
+
+    def close(self):
+        """
+        Releases memory-mapped file of the table.
+        """
+        if self.source is None:
+            return
+        for matrix in self.stops, self.transfers, self.next_stations:
+            matrix.release()
+        self.source.close()
+        self.source = None
+
+    def cell(self, station_from: str, station_to: str) -> int:
+        """
+        Finds index of the matrices cell for the pair of the stations.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        :returns: index of the cell, -1 if any station is not found.
+        """
+        if station_from not in self.ids or station_to not in self.ids:
+            return -1
+        return self.ids[station_from] * len(self) + self.ids[station_to]
+
+    def stops_between(self, station_from: str, station_to: str) -> int:
+        """
+        Gets minimum amount of the stops between stations.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        :returns: amount of the stops, -1 if station is not found or unreachable.
+        """
+        cell = self.cell(station_from, station_to)
+        return -1 if cell < 0 or self.stops[cell] == self.UNREACHABLE else self.stops[cell]
+
+    def transfers_between(self, station_from: str, station_to: str) -> int:
+        """
+        Gets minimum amount of the transfers between stations.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        :returns: amount of the transfers, -1 if station is not found or unreachable.
+        """
+        cell = self.cell(station_from, station_to)
+        return -1 if cell < 0 or self.transfers[cell] == self.UNREACHABLE else self.transfers[cell]
+
+    def path(self, station_from: str, station_to: str) -> list[str]:
+        """
+        Reconstructs path with the minimum amount of the stops from the next stations matrix.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        :returns: stations of the path, empty if station is not found or unreachable.
+        """
+        if self.stops_between(station_from, station_to) < 0:
+            return []
+        current, target, size = self.ids[station_from], self.ids[station_to], len(self)
+        path = [current]
+        while current != target:
+            current = self.next_stations[current * size + target]
+            path.append(current)
+        return [self.stations[identifier] for identifier in path]
+
+
+class Timetable:
+    """
+    Frequencies and running times of the public transport ways with the round-based (RAPTOR) earliest arrival query.
+    Each route is one way of the public transport, trips depart from its first stop every headway minutes
+    between the first and the last departure. All data is kept in the flat arrays and query buffers are reused.
+    Since buffers are shared between the queries, one instance must not be queried concurrently,
+    each thread or process needs its own timetable.
+
+    File format: csv with ';' separator and the lines
+    transport;way;first departure;last departure;headway;running times
+    For example:
+        Трамвай №1;forward;05:30;23:00;10;2 2 3 1 2 2 2 1 2 3 2 2 2 2 2 2
+
+    FILE_SOURCE - default file to load timetable from.
+    WAYS - names of the public transport ways in the file.
+    INFINITY - arrival time of the unreachable stations.
+    MAX_ROUNDS - default maximum amount of the rides in the route.
+    """
+    FILE_SOURCE = 'timetable.csv'
+    WAYS = ('forward', 'backward')
+    INFINITY = 2 ** 31 - 1
+    MAX_ROUNDS = 8
+
+    def __init__(self, station_count: int, routes, station_index: StationIndex | None = None):
+        """
+        Initiates timetable.
+
+        route_offsets - start of the route in the route_stops and route_times, by route index.
+        route_stops - identifiers of the stations of all routes.
+        route_times - minutes from the departure at the first stop to the stop, for all routes.
+        route_first, route_last, route_headway - first departure, last departure and headway by route index.
+        stop_offsets - start of the station in the stop_routes and stop_positions, by station identifier.
+        stop_routes, stop_positions - routes going through the station and position of the station in them.
+
+        :param station_count: amount of the stations.
+        :param routes: iterable of (station identifiers, running times, first departure, last departure, headway).
+        :param station_index: index to resolve names of the stations.
+        :raises ValueError: amount of the running times does not match amount of the stops or headway is not positive.
+        """
+        self.station_index = station_index
+        self.route_offsets, self.route_stops, self.route_times = array('i', [0]), array('i'), array('i')
+        self.route_first, self.route_last, self.route_headway = array('i'), array('i'), array('i')
+        stop_routes = [[] for _ in range(station_count)]
+        for route, (stops, running_times, first, last, headway) in enumerate(routes):
+            if len(running_times) != len(stops) - 1:
+                raise ValueError(f'Route {route} has {len(stops)} stops but {len(running_times)} running times.')
+            if headway <= 0:
+                raise ValueError(f'Headway of the route {route} must be positive.')
+            elapsed = 0
+            for position, station in enumerate(stops):
+                elapsed += running_times[position - 1] if position else 0
+                self.route_stops.append(station)
+                self.route_times.append(elapsed)
+                stop_routes[station].append((route, position))
+            self.route_offsets.append(len(self.route_stops))
+            self.route_first.append(first)
+            self.route_last.append(last)
+            self.route_headway.append(headway)
+
+        self.stop_offsets, self.stop_routes, self.stop_positions = array('i', [0]), array('i'), array('i')
+        for served in stop_routes:
+            for route, position in served:
+                self.stop_routes.append(route)
+                self.stop_positions.append(position)
+            self.stop_offsets.append(len(self.stop_routes))
+
+        self.__infinite = array('i', [self.INFINITY]) * station_count
+        self.__best, self.__previous, self.__current = array('i', self.__infinite), array('i', self.__infinite), \
+            array('i', self.__infinite)
+        self.__marked = array('b', [0]) * station_count
+        self.__queued = array('i', [-1]) * (len(self.route_offsets) - 1)
+
+    @property
+    def station_count(self) -> int:
+        """
+        Gets amount of the stations.
+
+        :returns: amount of the stations.
+        """
+        return len(self.stop_offsets) - 1
+
+    @property
+    def route_count(self) -> int:
+        """
+        Gets amount of the routes.
+
+        :returns: amount of the routes.
+        """
+        return len(self.route_offsets) - 1
+
+    @staticmethod
+    def parse_time(value: str) -> int:
+        """
+        Converts time in format HH:MM to the minutes from the midnight.
+
+        :param value: time in format HH:MM.
+        :returns: minutes from the midnight.
+        """
+        hours, minutes = value.strip().split(':')
+        return int(hours) * 60 + int(minutes)
+
+    @staticmethod
+    def format_time(minutes: int) -> str:
+        """
+        Converts minutes from the midnight to the format HH:MM.
+
+        :param minutes: minutes from the midnight.
+        :returns: formatted time.
+        """
+        return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+    @classmethod
+    def load(cls, manager: RouteManager, path: str = FILE_SOURCE):
+        """
+        Loads timetable of the network from the file.
+
+        :param manager: manager of the network.
+        :param path: file to load timetable from.
+        :raises ValueError: public transport or way from the file is not found.
+        :returns: loaded timetable.
+        """
+        routes = []
+        with open(path, encoding='utf-8', newline='') as file:
+            for row in reader(file, delimiter=';'):
+                if not row or not row[0].strip():
+                    continue
+                name, way, first, last, headway, running_times = (value.strip() for value in row)
+                transport = manager.find_transport(name)
+                if transport is None or way not in cls.WAYS:
+                    raise ValueError(f'Public transport {name} with the {way} way is not found.')
+                stops = transport.forward_ids if way == cls.WAYS[0] else transport.backward_ids
+                routes.append((stops, [int(value) for value in running_times.split()],
+                               cls.parse_time(first), cls.parse_time(last), int(headway)))
+        return cls(len(manager.station_index), routes, manager.station_index)
+
+    @classmethod
+    def uniform(cls, manager: RouteManager, headway: int = 10, running_time: int = 2,
+                first: int = 5 * 60 + 30, last: int = 23 * 60):
+        """
+        Creates timetable with the same headway and running time between stops for all the public transport ways.
+
+        :param manager: manager of the network.
+        :param headway: minutes between departures.
+        :param running_time: minutes between stops.
+        :param first: first departure in minutes from the midnight.
+        :param last: last departure in minutes from the midnight.
+        :returns: created timetable.
+        """
+        return cls(len(manager.station_index),
+                   [(way, [running_time] * (len(way) - 1), first, last, headway)
+                    for transport in manager.public_transport
+                    for way in (transport.forward_ids, transport.backward_ids) if way],
+                   manager.station_index)
+
+    @classmethod
+    def synthetic(cls, lines: int, stations: int, stops: int, seed: int = 0):
+        """
+        Creates random timetable, both ways of every line are served.
+
+        :param lines: amount of the lines.
+        :param stations: amount of the stations.
+        :param stops: amount of the stops of every line.
+        :param seed: seed of the random generator.
+        :returns: created timetable.
+        """
+        generator = random.Random(seed)
+        routes = []
+        for _ in range(lines):
+            way = generator.sample(range(stations), stops)
+            running_times = [generator.randint(1, 4) for _ in range(stops - 1)]
+            first, headway = generator.randint(300, 400), generator.choice((5, 7, 10, 12, 15, 20))
+            routes.append((way, running_times, first, 1380, headway))
+            routes.append((way[::-1], running_times[::-1], first, 1380, headway))
+        return cls(stations, routes)
+
+    def earliest_arrival(self, station_from: str, station_to: str, departure: int) -> int:
+        """
+        Finds the earliest arrival time between stations.
+
+        :param station_from: station to find route from.
+        :param station_to: station to find route to.
+        :param departure: departure time in minutes from the midnight.
+        :returns: arrival time in minutes from the midnight, -1 if station is not found or unreachable.
+        """
+        source, target = self.station_index.id_of(station_from), self.station_index.id_of(station_to)
+        return self.arrival(source, target, departure) if source >= 0 and target >= 0 else -1
+
+    def arrival(self, source: int, target: int, departure: int, max_rounds: int = MAX_ROUNDS) -> int:
+        """
+        Finds the earliest arrival time between stations with the round-based scan of the routes.
+        Round k finds the earliest arrivals with k rides.
+
+        :param source: identifier of the station to find route from.
+        :param target: identifier of the station to find route to.
+        :param departure: departure time in minutes from the midnight.
+        :param max_rounds: maximum amount of the rides.
+        :returns: arrival time in minutes from the midnight, -1 if station is unreachable.
+        """
+        infinity = self.INFINITY
+        best, previous, current = self.__best, self.__previous, self.__current
+        marked, queued = self.__marked, self.__queued
+        route_offsets, route_stops, route_times = self.route_offsets, self.route_stops, self.route_times
+        route_first, route_last, route_headway = self.route_first, self.route_last, self.route_headway
+        best[:] = previous[:] = self.__infinite
+        best[source] = previous[source] = departure
+        marked_stops = [source]
+        marked[source] = 1
+
+        for _ in range(max_rounds):
+            routes = []
+            for stop in marked_stops:
+                marked[stop] = 0
+                for index in range(self.stop_offsets[stop], self.stop_offsets[stop + 1]):
+                    route, position = self.stop_routes[index], self.stop_positions[index]
+                    if queued[route] < 0:
+                        routes.append(route)
+                        queued[route] = position
+                    elif position < queued[route]:
+                        queued[route] = position
+
+            current[:] = previous
+            marked_stops = []
+            for route in routes:
+                offset, end = route_offsets[route], route_offsets[route + 1]
+                first, last, headway = route_first[route], route_last[route], route_headway[route]
+                trip = infinity
+                for index in range(offset + queued[route], end):
+                    stop, elapsed = route_stops[index], route_times[index]
+                    if trip != infinity:
+                        arrival = trip + elapsed
+                        if arrival < best[stop] and arrival < best[target]:
+                            best[stop] = current[stop] = arrival
+                            if not marked[stop]:
+                                marked[stop] = 1
+                                marked_stops.append(stop)
+                    ready = previous[stop]
+                    if ready != infinity and ready < trip + elapsed:
+                        waited = ready - first - elapsed
+                        boarding = first + max(0, -(-waited // headway)) * headway
+                        if boarding <= last and boarding < trip:
+                            trip = boarding
+                queued[route] = -1
+
+            previous, current = current, previous
+            if not marked_stops:
+                break
+
+        for stop in marked_stops:
+            marked[stop] = 0
+        return best[target] if best[target] != infinity else -1
+
+    @classmethod
+    def benchmark(cls, lines: int = 1000, stations: int = 5000, stops: int = 30, queries: int = 200,
+                  seed: int = 0) -> dict:
+        """
+        Measures build and query time of the synthetic timetable.
+
+        :param lines: amount of the lines.
+        :param stations: amount of the stations.
+        :param stops: amount of the stops of every line.
+        :param queries: amount of the random queries.
+        :param seed: seed of the random generator.
+        :returns: measured values in seconds.
+        """
+        start = perf_counter()
+        timetable = cls.synthetic(lines, stations, stops, seed)
+        built = perf_counter()
+        generator = random.Random(seed)
+        reached = 0
+        for _ in range(queries):
+            reached += timetable.arrival(generator.randrange(stations), generator.randrange(stations),
+                                         generator.randint(360, 1200)) >= 0
+        finished = perf_counter()
+        return {'lines': lines, 'stations': stations, 'routes': timetable.route_count, 'queries': queries,
+                'reached': reached, 'build': built - start, 'query': (finished - built) / queries}
+
+
+class BatchPlanner:
+    """
+    Plans routes for the large batches of the origin-destination pairs.
+    Pairs are read by chunks and grouped by the origin, so one reachability sweep serves all destinations.
+    Origins are spread across the worker processes, each worker receives the network once.
+
+    CHUNK_SIZE - default amount of the pairs read at once.
+    HEADER - header of the input file, skipped if present.
+    RESULT_HEADER - header of the output file.
+    worker_manager - manager of the network the routes are planned with in the current process.
+    """
+    CHUNK_SIZE = 10_000
+    HEADER = ['from', 'to']
+    RESULT_HEADER = ['from', 'to', 'stops', 'transfers']
+    worker_manager = None
+
+    def __init__(self, manager: RouteManager, processes: int = None, chunk_size: int = CHUNK_SIZE):
+        """
+        Initiates planner.
+
+        :param manager: manager of the network.
+        :param processes: amount of the worker processes, amount of the cpu cores by default, 1 - no workers.
+        :param chunk_size: amount of the pairs read at once.
+        """
+        self.manager = manager
+        self.processes = processes or cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def init_worker(cls, manager: RouteManager):
+        """
+        Sets manager of the network for the planning in the current process.
+
+        :param manager: manager of the network.
+        """
+        cls.worker_manager = manager
+
+    @classmethod
+    def plan_origin(cls, origin: str, destinations: list[str]) -> list[tuple[int, int]]:
+        """
+        Plans routes from the one origin to many destinations with the one reachability sweep.
+        Sweep is not cached, so memory of the worker does not grow with the amount of the origins.
+
+        :param origin: station to find routes from.
+        :param destinations: stations to find routes to.
+        :returns: (stops, transfers) for every destination, (-1, -1) if station is not found or unreachable.
+        """
+        reachable = cls.worker_manager.reachability(origin, cache=False)
+        return [reachable.get(destination, (-1, -1)) for destination in destinations]
+
+    def plan(self, pairs) -> iter:
+        """
+        Plans routes for the stream of the pairs.
+
+        :param pairs: iterable of the (station from, station to) pairs.
+        :returns: generator of the (station from, station to, stops, transfers) in the order of the pairs.
+        """
+        if self.processes == 1:
+            self.init_worker(self.manager)
+            yield from self.plan_chunks(iter(pairs), None)
+            return
+        with ProcessPoolExecutor(self.processes, initializer=self.init_worker, initargs=(self.manager,)) as executor:
+            yield from self.plan_chunks(iter(pairs), executor)
+
+    def plan_chunks(self, pairs, executor: ProcessPoolExecutor | None) -> iter:
+        """
+        Plans routes for the stream of the pairs by chunks grouped by the origin.
+
+        :param pairs: iterator of the (station from, station to) pairs.
+        :param executor: pool of the worker processes, None - plans in the current process.
+        :returns: generator of the (station from, station to, stops, transfers) in the order of the pairs.
+        """
+        while chunk := list(islice(pairs, self.chunk_size)):
+            groups: dict[str, list[str]] = {}
+            for origin, destination in chunk:
+                groups.setdefault(origin, []).append(destination)
+            origins = list(groups)
+            planned = map(self.plan_origin, origins, groups.values()) if executor is None else \
+                executor.map(self.plan_origin, origins, groups.values(),
+                             chunksize=max(1, len(origins) // (self.processes * 4)))
+            results = {origin: iter(routes) for origin, routes in zip(origins, planned)}
+            for origin, destination in chunk:
+                yield (origin, destination, *next(results[origin]))
+
+    def plan_file(self, source: str, destination: str) -> int:
+        """
+        Plans routes for the pairs from the csv file and streams results to another csv file.
+
+        :param source: csv file with the columns: from, to.
+        :param destination: csv file to write results with the columns: from, to, stops, transfers.
+        :returns: amount of the planned pairs.
+        """
+        planned = 0
+        with open(source, encoding='utf-8', newline='') as input_file, \
+                open(destination, 'w', encoding='utf-8', newline='') as output_file:
+            rows = (row[:2] for row in reader(input_file) if len(row) >= 2)
+            first = next(rows, None)
+            if first is not None and [value.strip().lower() for value in first] != self.HEADER:
+                rows = chain([first], rows)
+            output = writer(output_file)
+            output.writerow(self.RESULT_HEADER)
+            for result in self.plan((origin.strip(), target.strip()) for origin, target in rows):
+                output.writerow(result)
+                planned += 1
+        return planned
+
+
+class RouteBenchmark:
+    """
+    Measures performance of the RouteManager on the provided network.
+
+    REPORT_FILE - format of the file name to save results to.
+    """
+    REPORT_FILE = "benchmark_report_from_{0:%Y_%d_%m_%H_%M_%S}.json"
+
+    def __init__(self, public_transport: list[PublicTransport], queries: int = 200, seed: int = 0):
+        """
+        Initiates benchmark.
+
+        :param public_transport: public transports of the network to measure.
+        :param queries: amount of the random queries of each kind.
+        :param seed: seed of the random generator.
+        """
+        self.public_transport = public_transport
+        self.queries = queries
+        self.seed = seed
+
+    @staticmethod
+    def timed(action) -> float:
+        """
+        Measures execution time of the action.
+
+        :param action: function without parameters to measure.
+        :returns: time in seconds.
+        """
+        start = perf_counter()
+        action()
+        return perf_counter() - start
+
+    def run(self) -> dict:
+        """
+        Measures build of the network, find_route, has_stop_in and population of the station lists.
+
+        :returns: network description, environment and measured time in seconds.
+        """
+        manager = None
+
+        def build():
+            nonlocal manager
+            manager = RouteManager(cache_size=0, public_transport=self.public_transport)
+
+        build_time = self.timed(build)
+        generator = random.Random(self.seed)
+        pairs = [(generator.choice(manager.all_stations), generator.choice(manager.all_stations))
+                 for _ in range(self.queries)]
+        stations = [generator.choice(manager.all_stations) for _ in range(self.queries)]
+
+        timings = {
+            'build': build_time,
+            'init_station_cross': self.timed(manager.init_station_cross),
+            'find_route': self.timed(lambda: [manager.find_route(*pair) for pair in pairs]) / self.queries,
+            'has_stop_in': self.timed(lambda: [manager.has_stop_in(station) for station in stations]) / self.queries,
+        }
+        manager.route_cache.size = self.queries
+        manager.warm_up(pairs)
+        timings['find_route_cached'] = self.timed(lambda: [manager.find_route(*pair) for pair in pairs]) / self.queries
+        timings.update(self.measure_lists(manager.all_stations))
+
+        return {
+            'network': {'lines': len(manager.public_transport), 'stations': len(manager.all_stations),
+                        'stops': sum(len(transport.forward_way) + len(transport.backward_way)
+                                     for transport in manager.public_transport)},
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'date': datetime.now().isoformat(timespec='seconds')},
+            'queries': self.queries,
+            'timings': timings
+        }
+
+    @staticmethod
+    def measure_lists(stations: list[str]) -> dict:
+        """
+        Measures population of the VirtualListbox and the plain Listbox with the stations.
+
+        :param stations: items to populate lists with.
+        :returns: measured time in seconds, None values if there is no display.
+        """
+        try:
+            root = Tk()
+        except TclError:
+            return {'virtual_listbox': None, 'listbox': None}
+        try:
+            virtual_listbox, listbox = VirtualListbox(root, height=20), Listbox(root, height=20)
+            return {'virtual_listbox': RouteBenchmark.timed(lambda: virtual_listbox.set_items(stations)),
+                    'listbox': RouteBenchmark.timed(lambda: listbox.insert('end', *stations))}
+        finally:
+            root.destroy()
+
+    def save(self, path: str = None) -> str:
+        """
+        Runs benchmark and saves results in json format.
+
+        :param path: file to save results to, REPORT_FILE by default.
+        :returns: path of the saved file.
+        """
+        path = path or self.REPORT_FILE.format(datetime.now())
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.run(), file, ensure_ascii=False, indent=4)
+        return path
+
+
 class RouteManagerWindow(Tk):
     """
     Interface of the module.
@@ -1104,6 +2866,7 @@ class RouteManagerWindow(Tk):
     PARAMETER_FRAME_HEIGHT - height of the frame of the current request.
     FONT - font style of the app.
     BACKGROUND - color of the background.
+    ROUTE_POLL_INTERVAL - delay in milliseconds between checks of the route evaluation.
     """
     WIDTH = 1280
     HEIGHT = 815
@@ -1111,46 +2874,63 @@ class RouteManagerWindow(Tk):
     HALF_WIDTH = int(WIDTH * 0.032)
     FONT = ("Cascadia Code PL SemiLight", 21)
     BACKGROUND = "white"
+    ROUTE_POLL_INTERVAL = 20
 
     ROUTE_NOT_FOUND = "Маршрут між {0} та {1} зупинками не знайдено."
+    ROUTE_SEARCHING = "Пошук маршруту між {0} та {1} зупинками..."
 
     def __init__(self):
         """
         Initiates window.
 
         route_manager - access to the information about the routes.
+        query_frames - frames of the queries that were already created.
+        route_worker - worker thread that evaluates routes.
+        route_future - result of the latest route evaluation.
         """
         super(RouteManagerWindow, self).__init__()
         self.route_manager = RouteManager()
+        self.route_manager.warm_up()
+        self.route_manager.listeners.append(self.refresh_stations)
         self.title("Інформаційний довідник транспортних засобів")
         self.resizable(height=False, width=False)
         self.geometry(f"{self.WIDTH}x{self.HEIGHT}")
         self.request_selector_frame = Frame(self)
         self.response_provider_frame = Frame(self)
         self.query_selector_combobox = Combobox()
-        self.transport_listbox = Listbox()
+        self.transport_listbox = VirtualListbox()
         self.forward_way_listbox = Listbox()
         self.backward_way_listbox = Listbox()
-        self.station_listbox = Listbox()
+        self.station_listbox = VirtualListbox()
         self.transport_through_station_listbox = Listbox()
-        self.station_from_listbox = Listbox()
-        self.station_to_listbox = Listbox()
+        self.station_from_listbox = VirtualListbox()
+        self.station_to_listbox = VirtualListbox()
         self.transport_through_station_label = Label()
         self.route_result_label = Label()
         self.station_from_value = ""
         self.station_to_value = ""
+        self.query_frames: dict[str, Frame] = {}
+        self.route_worker = ThreadPoolExecutor(max_workers=1)
+        self.route_future: Future | None = None
         self.QUERY_FRAMES = {"Маршрут громадського транспорту": self.pack_transport,
                              "Які транспортні засоби зупиняються на станції": self.pack_stations,
                              "Знайти маршрут через зупинки": self.pack_routes}
         self.init_query_selection_frame()
         self.bind("s", self.save_stations)
 
+    def destroy(self):
+        """
+        Stops route worker and closes window.
+        """
+        self.route_worker.shutdown(wait=False, cancel_futures=True)
+        super(RouteManagerWindow, self).destroy()
+
     @staticmethod
-    def get_listbox_item(box: Listbox):
+    def get_listbox_item(box: Listbox | VirtualListbox):
         """
         Get information about selected item.
 
-        :param box: Listbox to get information from.
+        :param box: Listbox or VirtualListbox to get information from.
         :returns: item at the selected index from the listbox.
         """
         indexes = box.curselection()
@@ -1169,12 +2949,23 @@ class RouteManagerWindow(Tk):
                                                 justify="center",
                                                 state="readonly")
         self.query_selector_combobox.current(0)
-        self.response_provider_frame = self.pack_transport()
+        self.response_provider_frame = self.query_frame(self.query_selector_combobox.get())
         self.query_selector_combobox.bind("<<ComboboxSelected>>", self.on_combobox_selected)
         self.query_selector_combobox.pack()
         self.request_selector_frame.pack()
         self.response_provider_frame.pack()
 
+    def query_frame(self, query: str) -> Frame:
+        """
+        Gets frame of the query, creates it on the first request only.
+
+        :param query: name of the query from QUERY_FRAMES.
+        :returns: frame of the query.
+        """
+        if query not in self.query_frames:
+            self.query_frames[query] = self.QUERY_FRAMES[query]()
+        return self.query_frames[query]
+
     def save_stations(self, _):
         file_to_save = f"{getcwd()}\\AllStations.txt"
         with open(file_to_save, 'w+', encoding='utf-8') as file:
@@ -1198,15 +2989,15 @@ class RouteManagerWindow(Tk):
                             bg=self.BACKGROUND,
                             width=self.HALF_WIDTH)
 
-        self.transport_listbox = Listbox(frame,
-                                         listvariable=Variable(value=self.route_manager.transports),
-                                         font=self.FONT,
-                                         bg=self.BACKGROUND,
-                                         width=self.WIDTH,
-                                         justify="center",
-                                         height=7,
-                                         selectmode="one")
-        self.transport_listbox.bind("<<ListboxSelect>>", self.on_transport_selected)
+        self.transport_listbox = VirtualListbox(frame,
+                                                items=self.route_manager.transports,
+                                                font=self.FONT,
+                                                bg=self.BACKGROUND,
+                                                width=self.WIDTH,
+                                                justify="center",
+                                                height=7,
+                                                selectmode="one")
+        self.transport_listbox.bind_select(self.on_transport_selected)
 
         forward_way_label = Label(left_frame,
                                   width=self.HALF_WIDTH,
@@ -1258,13 +3049,13 @@ class RouteManagerWindow(Tk):
                       height=self.PARAMETER_FRAME_HEIGHT,
                       width=self.WIDTH)
 
-        self.station_listbox = Listbox(frame,
-                                       listvariable=Variable(value=self.route_manager.all_stations),
-                                       width=self.HALF_WIDTH,
-                                       height=20,
-                                       font=self.FONT,
-                                       bg=self.BACKGROUND,
-                                       selectmode="one")
+        self.station_listbox = VirtualListbox(frame,
+                                              items=self.route_manager.all_stations,
+                                              width=self.HALF_WIDTH,
+                                              height=20,
+                                              font=self.FONT,
+                                              bg=self.BACKGROUND,
+                                              selectmode="one")
 
         self.transport_through_station_listbox = Listbox(frame,
                                                          width=self.HALF_WIDTH,
@@ -1283,7 +3074,7 @@ class RouteManagerWindow(Tk):
                                                      width=self.HALF_WIDTH,
                                                      bg=self.BACKGROUND)
 
-        self.station_listbox.bind("<<ListboxSelect>>", self.on_station_selected)
+        self.station_listbox.bind_select(self.on_station_selected)
         self.station_listbox.pack(side="left", expand=False)
         self.transport_through_station_listbox.pack()
         self.transport_through_station_label.pack(expand=True)
@@ -1300,25 +3091,25 @@ class RouteManagerWindow(Tk):
                       height=self.PARAMETER_FRAME_HEIGHT,
                       width=self.WIDTH)
 
-        self.station_from_listbox = Listbox(frame,
-                                            listvariable=Variable(value=self.route_manager.all_stations),
-                                            height=15,
-                                            width=self.HALF_WIDTH,
-                                            font=self.FONT,
-                                            bg=self.BACKGROUND)
-
-        self.station_from_listbox.bind("<<ListboxSelect>>", self.on_station_from_selected)
-        self.station_from_listbox.configure(exportselection=False)
-        self.station_to_listbox = Listbox(frame,
-                                          listvariable=Variable(value=self.route_manager.all_stations),
-                                          width=self.HALF_WIDTH,
-                                          height=15,
-                                          font=self.FONT,
-                                          bg=self.BACKGROUND,
-                                          justify="right")
-
-        self.station_to_listbox.bind("<<ListboxSelect>>", self.on_station_to_selected)
-        self.station_to_listbox.configure(exportselection=False)
+        self.station_from_listbox = VirtualListbox(frame,
+                                                   items=self.route_manager.all_stations,
+                                                   height=15,
+                                                   width=self.HALF_WIDTH,
+                                                   font=self.FONT,
+                                                   bg=self.BACKGROUND,
+                                                   exportselection=False)
+
+        self.station_from_listbox.bind_select(self.on_station_from_selected)
+        self.station_to_listbox = VirtualListbox(frame,
+                                                 items=self.route_manager.all_stations,
+                                                 width=self.HALF_WIDTH,
+                                                 height=15,
+                                                 font=self.FONT,
+                                                 bg=self.BACKGROUND,
+                                                 justify="right",
+                                                 exportselection=False)
+
+        self.station_to_listbox.bind_select(self.on_station_to_selected)
         self.route_result_label = Label(frame,
                                         font=self.FONT,
                                         width=self.WIDTH,
@@ -1330,13 +3121,25 @@ class RouteManagerWindow(Tk):
 
         return frame
 
+    def refresh_stations(self):
+        """
+        Network changed event handler.
+        Replaces items of the station lists keeping selected stations and updates ways of the selected transport.
+        """
+        for listbox in (self.station_listbox, self.station_from_listbox, self.station_to_listbox):
+            selected = self.get_listbox_item(listbox)
+            listbox.set_items(self.route_manager.all_stations)
+            if selected in listbox.items:
+                listbox.select_set(listbox.items.index(selected))
+        self.on_transport_selected(None)
+
     def on_combobox_selected(self, _):
         """
         Combobox selected event handler.
         Changes frame for current query.
         """
         self.response_provider_frame.pack_forget()
-        self.response_provider_frame = self.QUERY_FRAMES[self.query_selector_combobox.get()]()
+        self.response_provider_frame = self.query_frame(self.query_selector_combobox.get())
         self.response_provider_frame.pack()
 
     def on_transport_selected(self, _):
@@ -1398,12 +3201,33 @@ class RouteManagerWindow(Tk):
 
     def display_route(self):
         """
-        Displays route information.
+        Starts route evaluation on the route_worker and displays route information when it is ready.
+        """
+        self.route_result_label.configure(text=self.ROUTE_SEARCHING.format(self.station_from_value,
+                                                                           self.station_to_value))
+        self.route_future = self.route_worker.submit(self.route_manager.find_route,
+                                                     self.station_from_value, self.station_to_value)
+        self.after(self.ROUTE_POLL_INTERVAL, self.show_route, self.route_future,
+                   self.station_from_value, self.station_to_value)
+
+    def show_route(self, future: Future, station_from: str, station_to: str):
         """
-        found_route = self.route_manager.find_route(self.station_from_value, self.station_to_value)
+        Displays route information once it is evaluated.
+        Results of the outdated requests are ignored.
+
+        :param future: result of the route evaluation.
+        :param station_from: station the route was requested from.
+        :param station_to: station the route was requested to.
+        """
+        if future is not self.route_future:
+            return
+        if not future.done():
+            self.after(self.ROUTE_POLL_INTERVAL, self.show_route, future, station_from, station_to)
+            return
+
+        found_route = future.result()
         if not found_route:
-            self.route_result_label.configure(text=self.ROUTE_NOT_FOUND.format(self.station_from_value,
-                                                                               self.station_to_value))
+            self.route_result_label.configure(text=self.ROUTE_NOT_FOUND.format(station_from, station_to))
             return
         if isinstance(found_route, str):
             self.route_result_label.configure(text=found_route)
@@ -1450,7 +3274,133 @@ class RouteManagerWindow(Tk):
         self.on_station_selected(None)
 
 
+class Test(TestCase):
+    """
+    Test class to check the optimised structures against the straightforward evaluation.
+    """
+
+    @staticmethod
+    def earliest_arrival(timetable: Timetable, source: int, target: int, departure: int) -> int:
+        """
+        Finds the earliest arrival with the Dijkstra search over the stations, boarding the next trip of every route.
+        """
+        best, queue = {source: departure}, [(departure, source)]
+        while queue:
+            time, station = heappop(queue)
+            if time > best[station]:
+                continue
+            if station == target:
+                return time
+            for index in range(timetable.stop_offsets[station], timetable.stop_offsets[station + 1]):
+                route, position = timetable.stop_routes[index], timetable.stop_positions[index]
+                offset, end = timetable.route_offsets[route], timetable.route_offsets[route + 1]
+                first, headway = timetable.route_first[route], timetable.route_headway[route]
+                waited = time - first - timetable.route_times[offset + position]
+                boarding = first + max(0, -(-waited // headway)) * headway
+                if boarding > timetable.route_last[route]:
+                    continue
+                for following in range(offset + position + 1, end):
+                    stop, arrival = timetable.route_stops[following], boarding + timetable.route_times[following]
+                    if arrival < best.get(stop, Timetable.INFINITY):
+                        best[stop] = arrival
+                        heappush(queue, (arrival, stop))
+        return -1
+
+    def test_timetable_arrival_MatchesBruteForce(self):
+        generator = random.Random(7)
+        for seed in range(3):
+            timetable = Timetable.synthetic(30, 90, 8, seed)
+            for _ in range(200):
+                source, target = generator.randrange(90), generator.randrange(90)
+                departure = generator.randint(300, 1400)
+                with self.subTest(f'Seed = {seed}, {source} -> {target} at {departure}'):
+                    self.assertEqual(timetable.arrival(source, target, departure, timetable.station_count),
+                                     self.earliest_arrival(timetable, source, target, departure))
+
+    @staticmethod
+    def rebuilt(manager: RouteManager) -> RouteManager:
+        """
+        Creates manager of the same network from scratch.
+        """
+        return RouteManager(public_transport=[GeneratedTransport(transport.transport_number,
+                                                                 list(transport.forward_way),
+                                                                 list(transport.backward_way), transport.type)
+                                              for transport in manager.public_transport])
+
+    def assertSameNetwork(self, manager: RouteManager, pairs: list[tuple[str, str]]):
+        """
+        Checks that updated manager answers the same way as the manager built from scratch.
+        """
+        fresh = self.rebuilt(manager)
+        self.assertEqual(manager.all_stations, fresh.all_stations)
+        self.assertEqual(manager.line_cross, fresh.line_cross)
+        for station in manager.all_stations:
+            self.assertEqual(manager.reachability(station), fresh.reachability(station), station)
+            self.assertEqual([str(transport) for transport in manager.has_stop_in(station)],
+                             [str(transport) for transport in fresh.has_stop_in(station)], station)
+        for station_from, station_to in pairs:
+            route, expected = manager.find_route(station_from, station_to), fresh.find_route(station_from, station_to)
+            self.assertEqual(sorted(route) if isinstance(route, list) else route,
+                             sorted(expected) if isinstance(expected, list) else expected,
+                             (station_from, station_to))
+
+    def test_routeManager_IncrementalUpdates_MatchRebuiltManager(self):
+        operations = {
+            'update_line': lambda manager: manager.update_line(manager.transport_named('Трамвай №2'),
+                                                               ['Площа Ринок', 'Нова зупинка', 'Погулянка'],
+                                                               ['Погулянка', 'Площа Ринок']),
+            'remove_station': lambda manager: manager.remove_station('Площа Ринок'),
+            'remove_station of the transport': lambda manager: manager.remove_station('Погулянка', 'Трамвай №1'),
+            'insert_detour': lambda manager: manager.insert_detour('Трамвай №1', 'Вулиця Левицького', 'Погулянка',
+                                                                   ['Нова зупинка', 'Площа Соборна']),
+            'suspend_line': lambda manager: manager.suspend_line('Тролейбус №27'),
+            'resume_line': lambda manager: (manager.suspend_line('Трамвай №6'), manager.resume_line('Трамвай №6')),
+        }
+        for name, operation in operations.items():
+            with self.subTest(name):
+                manager = RouteManager()
+                generator = random.Random(5)
+                pairs = [(generator.choice(manager.all_stations), generator.choice(manager.all_stations))
+                         for _ in range(300)]
+                for station_from, station_to in pairs:
+                    manager.find_route(station_from, station_to)
+                for station in manager.all_stations[:60]:
+                    manager.reachability(station)
+                notified = []
+                manager.listeners.append(lambda: notified.append(True))
+                operation(manager)
+                self.assertTrue(notified)
+                self.assertSameNetwork(manager, pairs)
+
+    def test_batchPlanner_plan_MatchesReachability(self):
+        manager = RouteManager()
+        generator = random.Random(11)
+        stations = list(manager.station_index.names) + ['Невідома станція']
+        pairs = [(generator.choice(stations), generator.choice(stations)) for _ in range(400)]
+        expected = [(origin, destination, *manager.reachability(origin).get(destination, (-1, -1)))
+                    for origin, destination in pairs]
+        for processes in (1, 2):
+            with self.subTest(f'Processes = {processes}'):
+                self.assertEqual(list(BatchPlanner(manager, processes, chunk_size=37).plan(pairs)), expected)
+
+
 def main():
+    arguments = argv[1:]
+    if arguments and arguments[0] == 'distances':
+        DistanceTable.build(RouteManager()).save(arguments[1] if len(arguments) > 1 else DistanceTable.FILE_SOURCE)
+        return
+    if arguments and arguments[0] == 'batch' and len(arguments) >= 3:
+        planner = BatchPlanner(RouteManager(), int(arguments[3]) if len(arguments) >= 4 else None)
+        print(planner.plan_file(arguments[1], arguments[2]))
+        return
+    if arguments and arguments[0] == 'benchmark':
+        lines, stations, stops = map(int, arguments[1:4]) if len(arguments) >= 4 else (200, 2000, 30)
+        overlap = float(arguments[4]) if len(arguments) >= 5 else 0.5
+        print(RouteBenchmark(NetworkGenerator.random(lines, stations, stops, overlap)).save())
+        return
+    if arguments and arguments[0] == 'raptor':
+        print(Timetable.benchmark(*map(int, arguments[1:])))
+        return
     manager = RouteManagerWindow()
     manager.mainloop()
 
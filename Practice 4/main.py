@@ -1,5 +1,12 @@
 from abc import ABC, abstractmethod
-from inspect import stack
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
+from itertools import islice
+from re import compile
+from time import perf_counter
 from unittest import TestCase, main
 
 OPENING_PARENTHESIS = '('
@@ -10,6 +17,9 @@ OPENING_BRACKETS = ['(', '[', '{']
 CLOSING_BRACKETS = [')', ']', '}']
 NUMBERS = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0']
 SEMICOLON = ','
+PARENTHESIS_PATTERN = compile(r'[()]')
+PROGRAM_CACHE_SIZE = 1024
+TOKEN_PATTERN = compile(r' *(?:(\d+)|([^ ]))')
 
 
 class StackOverflowException(BaseException):
@@ -165,6 +175,222 @@ class Stack:
     def try_pop(self, default):
         return default if self.is_empty else self.pop()
 
+    def clear(self):
+        """
+        Removes all values from the stack.
+
+        :returns: same empty stack.
+        """
+        self.__storage.clear()
+        self.__space_used = 0
+        return self
+
+
+class CompactStack:
+    """
+    Base of the compact LIFO structures with the __slots__ and the storage of the concrete type.
+    Size of the stack is the length of the storage, capacity is checked only when it is set.
+
+    capacity - maximum amount of the values, None - stack is unbounded.
+    """
+    __slots__ = ('__capacity', '_storage')
+
+    def __init__(self, capacity: int | None = None):
+        self.capacity = capacity
+        self._storage = self.create_storage()
+
+    def __str__(self):
+        return f'{type(self).__name__}: ({self.size}/{self.capacity or "∞"}) [{", ".join(map(str, self._storage))}]'
+
+    def __len__(self):
+        return len(self._storage)
+
+    def __bool__(self):
+        return len(self._storage) != 0
+
+    @staticmethod
+    def create_storage():
+        """
+        Creates empty storage of the values.
+
+        :returns: empty storage.
+        """
+        return []
+
+    @property
+    def capacity(self) -> int | None:
+        """
+        Gets maximum size of the stack's storage.
+
+        :returns: capacity of the stack, None if stack is unbounded.
+        """
+        return self.__capacity
+
+    @capacity.setter
+    def capacity(self, value: int | None):
+        """
+        Sets maximum size of the stack's storage.
+
+        :param value: size of the storage, None - stack is unbounded.
+        :raises TypeError: Capacity of the stack must be integer value or None.
+        :raises ValueError: Capacity of the stack can not be less or equal zero.
+        """
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            raise TypeError("Capacity of the stack must be integer value or None.")
+        if value is not None and value <= 0:
+            raise ValueError('Capacity of the stack can not be less or equal zero.')
+        self.__capacity = value
+
+    @property
+    def size(self) -> int:
+        return len(self._storage)
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self._storage) == 0
+
+    @property
+    def is_full(self) -> bool:
+        return self.__capacity is not None and len(self._storage) >= self.__capacity
+
+    def push(self, value):
+        """
+        Adds value to the top of the stack.
+
+        :raises StackOverflowException: the size of the stack is equal to its capacity.
+        :returns: same stack with added value to the top.
+        """
+        if self.__capacity is not None and len(self._storage) >= self.__capacity:
+            raise StackOverflowException()
+        self._storage.append(value)
+        return self
+
+    def push_many(self, values):
+        """
+        Adds values to the top of the stack, the last value becomes the top one.
+
+        :raises StackOverflowException: values do not fit into the stack capacity, stack is not changed.
+        :returns: same stack with added values.
+        """
+        if self.__capacity is None:
+            self._storage.extend(values)
+            return self
+        values = values if isinstance(values, (list, tuple, array)) else list(values)
+        if len(self._storage) + len(values) > self.__capacity:
+            raise StackOverflowException()
+        self._storage.extend(values)
+        return self
+
+    def pop(self):
+        """
+        Gets value form the top of the stack and removes it from the storage.
+
+        :raises StackIsEmptyException: cannot get value from the empty stack.
+        :returns: value at the top of the stack.
+        """
+        if not self._storage:
+            raise StackIsEmptyException()
+        return self._storage.pop()
+
+    def pop_many(self, amount: int):
+        """
+        Gets values from the top of the stack and removes them from the storage.
+
+        :param amount: amount of the values.
+        :raises StackIsEmptyException: stack has less values than amount, stack is not changed.
+        :returns: storage of the values in the order of popping, the top value first.
+        """
+        if amount > len(self._storage):
+            raise StackIsEmptyException()
+        if amount <= 0:
+            return self.create_storage()
+        values = self._storage[-amount:]
+        del self._storage[-amount:]
+        return values[::-1]
+
+    def peek(self):
+        """
+        Gets value form the top of the stack.
+
+        :raises StackIsEmptyException: cannot get value from the empty stack.
+        :returns: value at the top of the stack.
+        """
+        if not self._storage:
+            raise StackIsEmptyException()
+        return self._storage[-1]
+
+    def try_pop(self, default):
+        return self._storage.pop() if self._storage else default
+
+    def clear(self):
+        """
+        Removes all values from the stack.
+
+        :returns: same empty stack.
+        """
+        del self._storage[:]
+        return self
+
+
+class ObjectStack(CompactStack):
+    """
+    Compact stack of any values.
+    """
+    __slots__ = ()
+
+
+class IntStack(CompactStack):
+    """
+    Compact stack of the 64-bit integers stored in the array, useful for the indexes.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def create_storage():
+        return array('q')
+
+
+class FloatStack(CompactStack):
+    """
+    Compact stack of the double precision floating point values stored in the array.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def create_storage():
+        return array('d')
+
+
+def benchmark_stacks(operations: int = 1_000_000) -> dict[str, float]:
+    """
+    Measures cost of the push and pop pair in nanoseconds for the stacks and the raw list.
+
+    :param operations: amount of the push and pop pairs.
+    :returns: nanoseconds per push and pop pair by the name of the structure.
+    """
+    def measure(push, pop, capacity_limited: bool = False) -> float:
+        amount = min(operations, Stack.CAPACITY_MAXIMUM - 1) if capacity_limited else operations
+        start = perf_counter()
+        for value in range(amount):
+            push(value)
+        for _ in range(amount):
+            pop()
+        return (perf_counter() - start) / amount * 1e9
+
+    raw, stack = [], Stack(Stack.CAPACITY_MAXIMUM - 1)
+    objects, integers, floats = ObjectStack(), IntStack(), FloatStack()
+    results = {'list': measure(raw.append, raw.pop),
+               'Stack': measure(stack.push, stack.pop, capacity_limited=True),
+               'ObjectStack': measure(objects.push, objects.pop),
+               'IntStack': measure(integers.push, integers.pop),
+               'FloatStack': measure(floats.push, floats.pop)}
+
+    start = perf_counter()
+    integers.push_many(range(operations))
+    integers.pop_many(operations)
+    results['IntStack.push_many/pop_many'] = (perf_counter() - start) / operations * 1e9
+    return results
+
 
 class Case:
     """
@@ -242,11 +468,11 @@ class Case:
 
 class TestCases:
     """
-    Loads and creates list of the Cases.
+    Loads and creates the Cases indexed by the target (test-method name).
     """
 
     def __init__(self, ):
-        self.__cases: list[Case] = []
+        self.__cases: dict[str, Case] = {}
 
     def __getitem__(self, target: str) -> Case | None:
         """
@@ -255,7 +481,7 @@ class TestCases:
         :param target: name of the test-method.
         :returns: Case that has method name as target.
         """
-        return next(filter(lambda transport: transport.target == target, self.__cases), None)
+        return self.__cases.get(target)
 
     def load(self, lines: list[str]):
         """
@@ -264,7 +490,8 @@ class TestCases:
         :param lines: list of the lines to create cases with.
         """
         while lines:
-            self.__cases.append(Case(lines))
+            case = Case(lines)
+            self.__cases.setdefault(case.target, case)
 
 
 class Test(TestCase):
@@ -272,12 +499,8 @@ class Test(TestCase):
     Test class to run test cases.
 
     CASES - TestCases manager.
-    STACK_DEEP - stack call deep to get name of the function that is test method.
-    STACK_FUNC_NAME_INFO - index of the
     """
     CASES = TestCases()
-    STACK_DEEP = 1
-    STACK_FUNC_NAME_INFO = 3
     TEST_FILE_SOURCE = 'testInput.txt'
 
     @classmethod
@@ -287,7 +510,7 @@ class Test(TestCase):
 
     @property
     def current(self) -> Case:
-        return self.CASES[stack()[self.STACK_DEEP][self.STACK_FUNC_NAME_INFO]]
+        return self.CASES[self._testMethodName]
 
     def test_stackCreation_CapacityNotInt_TypeError(self):
         for capacity in self.current.data:
@@ -313,6 +536,12 @@ class Test(TestCase):
     def test_stackPeek_CapacityLessThanSize_StackOverflowException(self):
         self.assertRaises(self.current.expected, self.current.data)
 
+    def test_compactStack_PushManyOverCapacity_StackOverflowException(self):
+        self.assertRaises(self.current.expected, self.current.data)
+
+    def test_compactStack_PopMany(self):
+        self.assertEqual(self.current.data(), self.current.expected)
+
     def test_get_parenthesis_DefaultOutput(self):
         expected = get_parenthesis(self.current.data)
         self.assertEqual(expected, self.current.expected)
@@ -325,6 +554,21 @@ class Test(TestCase):
         expected = get_parenthesis(self.current.data, 1)
         self.assertEqual(expected, self.current.expected)
 
+    def test_find_parenthesis_DefaultOutput(self):
+        expected = find_parenthesis(self.current.data)
+        self.assertEqual(expected, self.current.expected)
+
+    def test_find_parenthesis_SortByOpening(self):
+        expected = find_parenthesis(self.current.data, 0)
+        self.assertEqual(expected, self.current.expected)
+
+    def test_find_parenthesis_SortByClosing(self):
+        for sort_by in (1, 2):
+            with self.subTest(f'Sort by = {sort_by}'):
+                pairs = find_parenthesis(self.current.data, sort_by)
+                self.assertEqual(pairs, self.current.expected)
+                self.assertEqual(hash(pairs), hash(find_parenthesis(self.current.data, sort_by)))
+
     def test_is_valid_formula(self):
         expected = is_valid_formula(self.current.data)
         self.assertEqual(expected, self.current.expected)
@@ -333,32 +577,386 @@ class Test(TestCase):
         expected = Compiler().compile(self.current.data)
         self.assertEqual(expected, self.current.expected)
 
+    def test_compile_many(self):
+        self.assertEqual(list(Compiler().compile_many(self.current.data)), self.current.expected)
+
+    def test_compile_many_SkipInvalid(self):
+        for processes in (1, 2):
+            with self.subTest(f'Processes = {processes}'):
+                self.assertEqual(list(Compiler().compile_many(self.current.data, processes, skip_invalid=True)),
+                                 self.current.expected)
+
+    def test_formula_validator(self):
+        for formula, valid in zip(self.current.data, self.current.expected):
+            with self.subTest(f'Formula = {formula}'):
+                validator = FormulaValidator()
+                for index in range(0, len(formula), 3):
+                    validator.feed(formula[index:index + 3])
+                self.assertEqual(validator.finish()[0], valid)
+
+    def test_exact_evaluation(self):
+        for expression, value in zip(self.current.data, self.current.expected):
+            with self.subTest(f'Expression = {expression[:50]}'):
+                self.assertEqual(ExactEvaluator().evaluate(expression), value)
+
+    def test_program_evaluation(self):
+        for expression, value in zip(self.current.data, self.current.expected):
+            with self.subTest(f'Expression = {expression}'):
+                self.assertEqual(Program.compile(expression).run(), value)
+
 
 class Compiler:
     """
     Compiles expression in format:
     expression := number | S(expression, expression) | D(expression, expression)
     number := 0 | 1 | 2 | 3 | 4 | 5 | 6 | 7 | 8 | 9 | 0
+
+    Instance is reset before each compilation, so it can be reused for any amount of the expressions.
+    Stacks are unbounded, so the nesting depth is not limited.
+
+    CHUNK_SIZE - amount of the expressions sent to the worker process at once.
     """
+    CHUNK_SIZE = 10_000
+
     def __init__(self):
         self.state = InitialState(self)
-        self.previous_state = Stack(100)
-        self.stack = Stack(100)
+        self.previous_state = ObjectStack()
+        self.stack = ObjectStack()
         self.expression = ""
         self.current_index = 0
 
+    def reset(self, expression: str = ""):
+        """
+        Prepares compiler for the next expression without creating new stacks.
+
+        :param expression: expression to compile next.
+        """
+        self.state = InitialState(self)
+        self.previous_state.clear()
+        self.stack.clear()
+        self.expression = expression
+        self.current_index = 0
+
+    def compile_many(self, expressions, processes: int = 1, skip_invalid: bool = False):
+        """
+        Evaluates many expressions reusing the compiler.
+
+        :param expressions: iterable of the expressions.
+        :param processes: amount of the worker processes, 1 - evaluates in the current process.
+        :param skip_invalid: True - yields None for the invalid expressions, False - raises NotationException.
+        :returns: generator of the values in the order of the expressions.
+        """
+        if processes == 1:
+            for expression in expressions:
+                try:
+                    yield self.compile(expression)
+                except NotationException:
+                    if not skip_invalid:
+                        raise
+                    yield None
+            return
+
+        # At most 2 * processes chunks are read ahead, so the stream is never loaded into the memory at once.
+        expressions = iter(expressions)
+        chunks = iter(lambda: list(islice(expressions, self.CHUNK_SIZE)), [])
+        with ProcessPoolExecutor(processes) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(Compiler.compile_chunk, chunk, skip_invalid))
+                if len(pending) >= 2 * processes:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    @staticmethod
+    def compile_chunk(expressions: list[str], skip_invalid: bool) -> list:
+        """
+        Evaluates chunk of the expressions with the one compiler in the worker process.
+
+        :param expressions: list of the expressions.
+        :param skip_invalid: True - puts None for the invalid expressions, False - raises NotationException.
+        :returns: list of the values.
+        """
+        return list(Compiler().compile_many(expressions, 1, skip_invalid))
+
+    @staticmethod
+    def evaluate(expression: str) -> int:
+        """
+        Evaluates expression with predefined format through the cached compiled Program.
+
+        :param expression: expression to compile and evaluate
+        """
+        return Program.compile(expression).run()
+
     def compile(self, expression: str) -> int:
         """
         Evaluates expression with predefined format.
 
         :param expression: expression to compile and evaluate
         """
-        self.expression = expression
+        self.reset(expression)
         while not isinstance(self.state, FinalState):
             self.state.accept_letter()
         return int(sum([self.stack.try_pop(0) for _ in range(self.stack.size)]))
 
 
+class ExpressionParser:
+    """
+    Recursive-descent parser of the Compiler grammar into the postfix instructions of the Program.
+    """
+    EXPRESSION_END = 'end of the expression'
+    NUMBER = 'number'
+    NOT_ZERO = 'number from 1 to 9'
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.index = 0
+        self.instructions: list[tuple[int, int]] = []
+
+    @property
+    def letter(self) -> str:
+        return self.expression[self.index] if self.index < len(self.expression) else ''
+
+    def raise_exception(self, expected: str):
+        raise NotationException(expected, self.letter, self.index, self.expression)
+
+    def skip_spaces(self):
+        while self.letter == ' ':
+            self.index += 1
+
+    def expect(self, letter: str):
+        """
+        Skips spaces and expected letter.
+
+        :param letter: letter that must be next.
+        :raises NotationException: next letter is not expected one.
+        """
+        self.skip_spaces()
+        if self.letter != letter:
+            self.raise_exception(letter)
+        self.index += 1
+
+    def parse(self) -> list[tuple[int, int]]:
+        """
+        Parses whole expression.
+
+        :raises NotationException: expression does not match the grammar.
+        :returns: postfix instructions of the expression, empty expression is evaluated as 0.
+        """
+        self.skip_spaces()
+        if not self.letter:
+            return [(Program.PUSH, 0)]
+        self.parse_expression()
+        self.skip_spaces()
+        if self.letter:
+            self.raise_exception(self.EXPRESSION_END)
+        return self.instructions
+
+    def parse_expression(self, is_divisor: bool = False):
+        """
+        Parses expression := number | S(expression, expression) | D(expression, expression).
+
+        :param is_divisor: expression is the second argument of the division, so it can not be 0.
+        :raises NotationException: expression does not match the grammar.
+        """
+        self.skip_spaces()
+        letter = self.letter
+        if letter in NUMBERS:
+            if is_divisor and letter == '0':
+                self.raise_exception(self.NOT_ZERO)
+            self.instructions.append((Program.PUSH, int(letter)))
+            self.index += 1
+            return
+        if letter not in ('S', 'D'):
+            self.raise_exception(self.NUMBER)
+
+        self.index += 1
+        self.expect(OPENING_PARENTHESIS)
+        self.parse_expression()
+        self.expect(SEMICOLON)
+        self.skip_spaces()
+        second_index = self.index
+        self.parse_expression(letter == 'D')
+        self.expect(CLOSING_PARENTHESIS)
+        self.instructions.append((Program.ADD, 0) if letter == 'S' else (Program.DIVIDE, second_index))
+
+
+class Program:
+    """
+    Compiled expression of the Compiler grammar as the postfix instructions.
+    Expressions are parsed once and cached by the text, so the repeated evaluation runs the instructions only.
+
+    PUSH - instruction to put the number on the stack.
+    ADD - instruction to replace two top numbers with their sum.
+    DIVIDE - instruction to replace two top numbers with their quotient,
+             argument is the index of the divisor in the expression.
+    """
+    PUSH, ADD, DIVIDE = 0, 1, 2
+
+    def __init__(self, expression: str, instructions: list[tuple[int, int]]):
+        self.expression = expression
+        self.instructions = tuple(instructions)
+
+    def __len__(self):
+        return len(self.instructions)
+
+    @classmethod
+    @lru_cache(maxsize=PROGRAM_CACHE_SIZE)
+    def compile(cls, expression: str):
+        """
+        Parses expression into the program.
+
+        :param expression: expression to compile.
+        :raises NotationException: expression does not match the grammar.
+        :returns: compiled program, the same instance for the same expression text.
+        """
+        return cls(expression, ExpressionParser(expression).parse())
+
+    def run(self) -> int:
+        """
+        Evaluates program.
+
+        :raises NotationException: divisor is evaluated to zero.
+        :returns: integer part of the expression value.
+        """
+        stack = []
+        push, pop = stack.append, stack.pop
+        for code, argument in self.instructions:
+            if code == Program.PUSH:
+                push(argument)
+            elif code == Program.ADD:
+                second = pop()
+                stack[-1] += second
+            else:
+                second = pop()
+                if second == 0:
+                    raise NotationException(ExpressionParser.NOT_ZERO, self.expression[argument], argument,
+                                            self.expression)
+                stack[-1] /= second
+        return int(stack[0])
+
+
+class ExactEvaluator:
+    """
+    Iterative evaluator of the Compiler grammar with the multi-digit numbers and exact Fraction arithmetic.
+    Keeps the opened operators and the values in the stacks instead of the call stack,
+    so the nesting depth is limited by the memory only.
+
+    EXPECT_EXPRESSION - number, 'S' or 'D' must be next.
+    EXPECT_OPENING - '(' must be next.
+    AFTER_EXPRESSION - ',', ')' or the end of the expression must be next.
+    """
+    EXPECT_EXPRESSION, EXPECT_OPENING, AFTER_EXPRESSION = 0, 1, 2
+
+    def __init__(self):
+        self.operators = ObjectStack()
+        self.values = ObjectStack()
+
+    @staticmethod
+    def raise_exception(expected: str, match, expression: str):
+        index = match.start(match.lastindex) if match is not None else len(expression)
+        raise NotationException(expected, expression[index:index + 1], index, expression)
+
+    def evaluate(self, expression: str) -> Fraction:
+        """
+        Evaluates expression := number | S(expression, expression) | D(expression, expression).
+
+        :param expression: expression to evaluate, empty expression is evaluated as 0.
+        :raises NotationException: expression does not match the grammar or divisor is evaluated to zero.
+        :returns: exact value of the expression.
+        """
+        operators, values = self.operators.clear(), self.values.clear()
+        # operators keep [letter, is_second_argument, index of the second argument]
+        state = self.EXPECT_EXPRESSION
+        match = None
+        for match in TOKEN_PATTERN.finditer(expression):
+            number, letter = match.groups()
+            if state == self.EXPECT_EXPRESSION:
+                if number is not None:
+                    values.push(int(number))
+                    state = self.AFTER_EXPRESSION
+                elif letter in ('S', 'D'):
+                    operators.push([letter, False, 0])
+                    state = self.EXPECT_OPENING
+                else:
+                    self.raise_exception(ExpressionParser.NUMBER, match, expression)
+            elif state == self.EXPECT_OPENING:
+                if letter != OPENING_PARENTHESIS:
+                    self.raise_exception(OPENING_PARENTHESIS, match, expression)
+                state = self.EXPECT_EXPRESSION
+            elif operators.is_empty:
+                self.raise_exception(ExpressionParser.EXPRESSION_END, match, expression)
+            elif not operators.peek()[1]:
+                if letter != SEMICOLON:
+                    self.raise_exception(SEMICOLON, match, expression)
+                operator = operators.peek()
+                operator[1] = True
+                operator[2] = match.end()
+                state = self.EXPECT_EXPRESSION
+            else:
+                if letter != CLOSING_PARENTHESIS:
+                    self.raise_exception(CLOSING_PARENTHESIS, match, expression)
+                self.apply(operators.pop(), values, expression)
+
+        # Trailing spaces are not tokens, so the end of the input is checked only by the state.
+        if state == self.EXPECT_EXPRESSION and match is None:
+            return Fraction(0)
+        if state != self.AFTER_EXPRESSION or not operators.is_empty:
+            expected = ExpressionParser.NUMBER if state == self.EXPECT_EXPRESSION else \
+                OPENING_PARENTHESIS if state == self.EXPECT_OPENING else \
+                CLOSING_PARENTHESIS if operators.peek()[1] else SEMICOLON
+            self.raise_exception(expected, None, expression)
+        return Fraction(values.pop())
+
+    @staticmethod
+    def apply(operator: list, values: ObjectStack, expression: str):
+        """
+        Replaces two top values with the result of the operator.
+        Values stay integers while the division is exact.
+
+        :param operator: closed operator.
+        :param values: stack of the values.
+        :param expression: evaluated expression.
+        :raises NotationException: divisor is evaluated to zero.
+        """
+        second = values.pop()
+        first = values.pop()
+        if operator[0] == 'S':
+            values.push(first + second)
+            return
+        if second == 0:
+            index = operator[2] + len(expression[operator[2]:]) - len(expression[operator[2]:].lstrip(' '))
+            raise NotationException(ExpressionParser.NOT_ZERO, expression[index], index, expression)
+        if isinstance(first, int) and isinstance(second, int) and first % second == 0:
+            values.push(first // second)
+        else:
+            values.push(Fraction(first, second))
+
+    @classmethod
+    def benchmark(cls, nodes: int = 1_000_000) -> dict[str, float]:
+        """
+        Measures evaluation of the deeply nested and of the balanced expression with the same amount of the nodes.
+
+        :param nodes: amount of the numbers and the operators in the expression, even amount is rounded up.
+        :returns: seconds of the evaluation by the shape of the expression.
+        """
+        depth = nodes // 2
+        nested = 'S(' * depth + '12' + ', 3)' * depth
+        # Neighbouring subtrees are joined level by level, so both shapes have depth operators and depth + 1 numbers.
+        level = ['12'] + ['3'] * depth
+        while len(level) > 1:
+            pairs = zip(level[::2], level[1::2])
+            level = [f'S({first}, {second})' for first, second in pairs] + level[len(level) & ~1:]
+        balanced = level[0]
+
+        evaluator, results = cls(), {}
+        for name, expression in (('nested', nested), ('balanced', balanced)):
+            start = perf_counter()
+            evaluator.evaluate(expression)
+            results[name] = perf_counter() - start
+        return results
+
+
 class State(ABC):
     """
     Base of the state machine to compile the expression.
@@ -379,16 +977,20 @@ class State(ABC):
 
     SecondArgument  -> (expression starts with letter 'S') SumState
                     -> (expression starts with letter 'D') DivideState
-                    -> (')' provided) Previous state
+                    -> (')' provided) Previous state, OneNumberState for the outermost operator
+                    -> (end of the expression) Error
 
     FinalState      -> Ends execution
 
+    Every argument must be exactly one number or operator, otherwise NotationException is raised.
+
     """
     EXPRESSION_END = 'end of the expression'
     NUMBER = 'number'
 
     def __init__(self, context: Compiler):
         self.context = context
+        self.has_value = False
 
     @property
     def letter(self):
@@ -421,8 +1023,11 @@ class State(ABC):
         self.change_state(new_state)
 
     def rollback_state(self):
-        if not self.context.previous_state.is_empty:
+        if self.context.previous_state.is_empty:
+            self.context.state = OneNumberState(self.context)
+        else:
             self.context.state = self.context.previous_state.pop()
+        self.context.state.has_value = True
         self.next()
 
     def raise_exception(self, expected: str, index=None):
@@ -457,6 +1062,9 @@ class InitialState(State):
 
         if self.letter == 'D':
             self.change_state(DivideState)
+            return
+
+        self.raise_exception(self.NUMBER)
 
 
 class OneNumberState(State):
@@ -470,11 +1078,6 @@ class OneNumberState(State):
             self.next()
             return
 
-        if self.letter in NUMBERS:
-            self.push(self.pop() + self.letter)
-            self.next()
-            return
-
         self.raise_exception(self.EXPRESSION_END)
 
 
@@ -483,32 +1086,42 @@ class OperatorState(State):
     def accept_letter(self):
         if self.letter == ' ':
             self.next()
-            return
+            return True
 
         if self.letter != '(':
             self.raise_exception('(')
+        return False
 
 
 class SumState(OperatorState):
 
     def accept_letter(self):
-        super(SumState, self).accept_letter()
+        if super(SumState, self).accept_letter():
+            return
         self.change_state(FirstSumArgumentState)
 
 
 class DivideState(OperatorState):
     def accept_letter(self):
-        super(DivideState, self).accept_letter()
+        if super(DivideState, self).accept_letter():
+            return
         self.change_state(FirstDivideArgumentState)
 
 
 class ArgumentInputState(State, ABC):
+    SEPARATOR = ','
 
     def handle_argument_input(self):
         if self.letter == ' ':
             self.next()
             return True
 
+        if self.has_value and self.letter not in (',', ')'):
+            self.raise_exception(self.SEPARATOR)
+
+        if not self.has_value and self.letter in (',', ')'):
+            self.raise_exception(self.NUMBER)
+
         if self.letter == 'S':
             self.change_and_save_state(SumState)
             return True
@@ -536,18 +1149,19 @@ class FirstSumArgumentState(ArgumentInputState):
             self.raise_exception(self.NUMBER)
 
         self.push(int(self.letter))
+        self.has_value = True
         self.next()
 
 
 class SecondSumArgumentInputState(ArgumentInputState):
+    SEPARATOR = ')'
 
     def accept_letter(self):
         if super(SecondSumArgumentInputState, self).handle_argument_input():
             return
 
         if self.is_end_of_expression:
-            self.change_state(FinalState)
-            return
+            self.raise_exception(')')
 
         if self.letter == ')':
             second, first = self.pop(), self.pop()
@@ -559,6 +1173,7 @@ class SecondSumArgumentInputState(ArgumentInputState):
             self.raise_exception(self.NUMBER)
 
         self.push(int(self.letter))
+        self.has_value = True
         self.next()
 
 
@@ -579,18 +1194,19 @@ class FirstDivideArgumentState(ArgumentInputState):
             self.raise_exception(self.NUMBER)
 
         self.push(int(self.letter))
+        self.has_value = True
         self.next()
 
 
 class SecondDivideArgumentInputState(ArgumentInputState):
+    SEPARATOR = ')'
 
     def accept_letter(self):
         if super(SecondDivideArgumentInputState, self).handle_argument_input():
             return
 
         if self.is_end_of_expression:
-            self.change_state(FinalState)
-            return
+            self.raise_exception(')')
 
         if self.letter == ')':
             second, first = self.pop(), self.pop()
@@ -607,6 +1223,7 @@ class SecondDivideArgumentInputState(ArgumentInputState):
             self.raise_exception('number from 1 to 9')
 
         self.push(int(self.letter))
+        self.has_value = True
         self.next()
 
 
@@ -644,6 +1261,89 @@ def get_parenthesis(line: str, sort_by: int = -1) -> list[tuple]:
         else list(reversed([result.pop() for _ in range(result.size)]))
 
 
+class ParenthesisPairs:
+    """
+    Compact storage of the parenthesis pairs: indexes of the opening and closing parenthesis in two parallel arrays.
+    """
+
+    def __init__(self, openings: array, closings: array):
+        self.openings = openings
+        self.closings = closings
+
+    def __str__(self):
+        return f'ParenthesisPairs({len(self)}) [{", ".join(map(str, self))}]'
+
+    def __len__(self):
+        return len(self.openings)
+
+    def __getitem__(self, index: int) -> tuple:
+        return self.openings[index], self.closings[index]
+
+    def __iter__(self):
+        return zip(self.openings, self.closings)
+
+    def __eq__(self, other):
+        if isinstance(other, ParenthesisPairs):
+            return self.openings == other.openings and self.closings == other.closings
+        return list(self) == other
+
+    def __hash__(self):
+        return hash((self.openings.tobytes(), self.closings.tobytes()))
+
+    def to_list(self) -> list[tuple]:
+        """
+        Converts pairs to the format of the get_parenthesis.
+
+        :returns: list of the tuples of the parenthesis.
+        """
+        return list(self)
+
+
+def find_parenthesis(line: str, sort_by: int = -1) -> ParenthesisPairs:
+    """
+    Gather information about indexes of the parenthesis on the huge lines.
+    Parenthesis are found with the regular expression, openings are kept in the preallocated array.
+    Pairs are placed in the order of the opening parenthesis by their ordinal, so no sorting is needed.
+
+    :param line: line to parse indexes of the parenthesis from.
+    :param sort_by: order of the pairs:  -1 or 1 and greater - sorted by closing parenthesis,
+                                         0 sorted by opening parenthesis.
+    :raise ParenthesisMissmatchException: amount of the closing parenthesis is not equal to opening ones.
+    :raise StackIsEmptyException: closing parenthesis goes before its opening one.
+    :returns: pairs of the parenthesis.
+    """
+    open_parenthesis_amount = line.count(OPENING_PARENTHESIS)
+    close_parenthesis_amount = line.count(CLOSING_PARENTHESIS)
+    if open_parenthesis_amount != close_parenthesis_amount:
+        raise ParenthesisMissmatchException(open_parenthesis_amount, close_parenthesis_amount)
+
+    openings = array('q', [0]) * open_parenthesis_amount
+    closings = array('q', [0]) * open_parenthesis_amount
+    pending = array('q', [0]) * open_parenthesis_amount
+    closing_order = array('q', [0]) * open_parenthesis_amount
+    top = opened = closed = 0
+
+    for match in PARENTHESIS_PATTERN.finditer(line):
+        index = match.start()
+        if line[index] == OPENING_PARENTHESIS:
+            openings[opened] = index
+            pending[top] = opened
+            opened += 1
+            top += 1
+            continue
+        if top == 0:
+            raise StackIsEmptyException()
+        top -= 1
+        closings[pending[top]] = index
+        closing_order[closed] = pending[top]
+        closed += 1
+
+    if sort_by == 0:
+        return ParenthesisPairs(openings, closings)
+    return ParenthesisPairs(array('q', [openings[ordinal] for ordinal in closing_order]),
+                            array('q', [closings[ordinal] for ordinal in closing_order]))
+
+
 def get_closing_bracket(opening: str) -> str:
     """
     Finds proper closing bracket for opening one.
@@ -698,6 +1398,153 @@ def is_valid_formula(line: str) -> bool:
     return operands_stack.size <= 1 and operators_stack.is_empty
 
 
+class FormulaValidator:
+    """
+    Incremental version of the is_valid_formula for the formulas that do not fit into the memory.
+    Accepts formula by chunks and keeps only the state of the stacks:
+    amount of the operands and, for every opened bracket, amount of the operators pushed after it.
+
+    CHUNK_SIZE - amount of the characters read from the stream at once.
+    """
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self):
+        self.operands = 0
+        self.levels: list[list] = [[None, 0]]
+        self.is_letter_can_be_next = True
+        self.offset = 0
+        self.error_offset = -1
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        Defines whether formula was valid so far.
+
+        :returns: False - if invalid part was already found. True - otherwise.
+        """
+        return self.error_offset < 0
+
+    def fail(self, offset: int) -> bool:
+        self.error_offset = offset
+        return False
+
+    def pop_operators(self, amount: int) -> bool:
+        """
+        Pops operators of the top level, each of them takes two operands and leaves one.
+
+        :param amount: amount of the operators to pop.
+        :returns: True - if there were enough operands. False - otherwise.
+        """
+        if amount and self.operands < amount + 1:
+            return False
+        self.operands -= amount
+        self.levels[-1][1] -= amount
+        return True
+
+    def close(self, letter: str) -> bool:
+        """
+        Handles closing bracket the same way as is_valid_formula does:
+        pops operators and brackets until the matching one.
+
+        :param letter: closing bracket.
+        :returns: True - if closing bracket is valid. False - otherwise.
+        """
+        while True:
+            bracket, operators = self.levels[-1]
+            if operators:
+                # get_closing_bracket gives "}" for any operator, so is_valid_formula closes "}" at the operator.
+                if letter == get_closing_bracket(OPERATORS[0]):
+                    self.levels[-1][1] -= 1
+                    return True
+                if not self.pop_operators(operators):
+                    return False
+                continue
+            if bracket is None:
+                return False
+            self.levels.pop()
+            if letter == get_closing_bracket(bracket):
+                return True
+            if self.operands < 2:
+                return False
+            self.operands -= 1
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Validates next part of the formula.
+
+        :param chunk: next characters of the formula.
+        :returns: True - if formula is valid so far. False - otherwise.
+        """
+        if not self.is_valid:
+            self.offset += len(chunk)
+            return False
+        for position, letter in enumerate(chunk, self.offset):
+            if letter in OPERANDS:
+                self.operands += 1
+                if not self.is_letter_can_be_next:
+                    self.offset += len(chunk)
+                    return self.fail(position)
+                self.is_letter_can_be_next = False
+            elif letter in OPERATORS:
+                self.is_letter_can_be_next = True
+                self.levels[-1][1] += 1
+            elif letter in OPENING_BRACKETS:
+                self.levels.append([letter, 0])
+            elif letter in CLOSING_BRACKETS and not self.close(letter):
+                self.offset += len(chunk)
+                return self.fail(position)
+        self.offset += len(chunk)
+        return True
+
+    def finish(self) -> tuple[bool, int]:
+        """
+        Validates end of the formula.
+
+        :returns: validity of the formula and offset of the error, -1 if formula is valid.
+        """
+        if self.is_valid and (len(self.levels) > 1 or not self.pop_operators(self.levels[0][1])
+                              or self.operands > 1):
+            self.fail(self.offset)
+        return self.is_valid, self.error_offset
+
+    @classmethod
+    def validate_chunks(cls, chunks) -> tuple[bool, int]:
+        """
+        Validates formula provided by chunks.
+
+        :param chunks: iterable of the parts of the formula.
+        :returns: validity of the formula and offset of the error, -1 if formula is valid.
+        """
+        validator = cls()
+        for chunk in chunks:
+            if not validator.feed(chunk):
+                break
+        return validator.finish()
+
+    @classmethod
+    def validate_stream(cls, stream, chunk_size: int = CHUNK_SIZE) -> tuple[bool, int]:
+        """
+        Validates formula from the text stream: opened file or socket.makefile('r').
+
+        :param stream: object with the read(size) method.
+        :param chunk_size: amount of the characters read at once.
+        :returns: validity of the formula and offset of the error, -1 if formula is valid.
+        """
+        return cls.validate_chunks(iter(lambda: stream.read(chunk_size), ''))
+
+    @classmethod
+    def validate_file(cls, path: str, chunk_size: int = CHUNK_SIZE) -> tuple[bool, int]:
+        """
+        Validates formula stored in the file.
+
+        :param path: file with the formula.
+        :param chunk_size: amount of the characters read at once.
+        :returns: validity of the formula and offset of the error, -1 if formula is valid.
+        """
+        with open(path, encoding='utf-8') as stream:
+            return cls.validate_stream(stream, chunk_size)
+
+
 def run():
     c = Compiler()
     print(c.compile("D(S(9, S(2, 9)), D(4, 2))"))
@@ -1,9 +1,20 @@
+import csv
 import random
 import string
-from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import date, datetime
+from functools import lru_cache
+from heapq import heappop, heappush, heapreplace, nlargest
+from io import StringIO
+from itertools import cycle, repeat
 from os import getcwd
+from os.path import getsize, join
 from re import compile
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest import TestCase
 
 
 class QueueIsEmptyException(BaseException):
@@ -15,6 +26,15 @@ class QueueIsEmptyException(BaseException):
         super(QueueIsEmptyException, self).__init__('Queue is empty')
 
 
+class QueueIsFullException(BaseException):
+    """
+    Uses when queue has reached its capacity.
+    """
+
+    def __init__(self):
+        super(QueueIsFullException, self).__init__('Queue is full')
+
+
 class TruckNumberNotValidException(BaseException):
     """
     Raises if the truck number value does not match the pattern 'LLDDDDLL':
@@ -60,10 +80,35 @@ class PriceNotValidException(BaseException):
                                                      f'\nFor example: [12.5, 15.0, 0.0]')
 
 
+class QueueView:
+    """
+    Readonly view of the queue storage, reflects further changes of the queue.
+    """
+    __slots__ = ('__storage',)
+
+    def __init__(self, storage: deque):
+        self.__storage = storage
+
+    def __len__(self):
+        return len(self.__storage)
+
+    def __iter__(self):
+        return iter(self.__storage)
+
+    def __reversed__(self):
+        return reversed(self.__storage)
+
+    def __getitem__(self, index: int):
+        return self.__storage[index]
+
+    def __contains__(self, value):
+        return value in self.__storage
+
+
 class Queue:
     def __init__(self, capacity: int):
+        self.__storage = deque()
         self.capacity = capacity
-        self.__storage = []
 
     def __str__(self):
         return f'Queue({self.capacity}) <{", ".join([str(item) for item in self.__storage])}>'
@@ -71,6 +116,9 @@ class Queue:
     def __bool__(self):
         return not self.is_empty
 
+    def __len__(self):
+        return len(self.__storage)
+
     @property
     def is_empty(self):
         """
@@ -80,6 +128,15 @@ class Queue:
         """
         return len(self.__storage) == 0
 
+    @property
+    def is_full(self):
+        """
+        Defines is queue full.
+
+        :returns: is amount of the elements equal to the capacity.
+        """
+        return len(self.__storage) >= self.__capacity
+
     @property
     def capacity(self):
         """
@@ -95,10 +152,12 @@ class Queue:
         Sets the capacity of the queue.
 
         :param value: capacity of the queue.
-        :exception ValueError: capacity of the queue must be grater than zero.
+        :exception ValueError: capacity of the queue must be grater than zero and not less than its size.
         """
         if value <= 0:
             raise ValueError("Capacity of the queue can not be less or equal zero")
+        if value < len(self.__storage):
+            raise ValueError("Capacity of the queue can not be less than amount of its elements")
         self.__capacity = value
 
     def into(self, value):
@@ -106,8 +165,11 @@ class Queue:
         Add element to the queue.
 
         :param value: element to add the the queue.
+        :exception QueueIsFullException: can not add element to the full queue.
         :returns: same queue.
         """
+        if len(self.__storage) >= self.__capacity:
+            raise QueueIsFullException()
         self.__storage.append(value)
         return self
 
@@ -118,11 +180,9 @@ class Queue:
         :exception QueueIsEmptyException: can not get element from the empty queue.
         :returns: first element from the queue.
         """
-        if self.is_empty:
+        if not self.__storage:
             raise QueueIsEmptyException()
-        result = self.__storage[0]
-        self.__storage.remove(result)
-        return result
+        return self.__storage.popleft()
 
     def back(self):
         """
@@ -149,11 +209,11 @@ class Queue:
     @property
     def source(self):
         """
-        Get storage data copy.
+        Get readonly view of the storage data without copying it.
 
-        :returns: copy of the queue.
+        :returns: view of the queue from the first element to the last one.
         """
-        return self.__storage.copy()
+        return QueueView(self.__storage)
 
     def filter(self, selector=lambda x: True) -> list:
         """
@@ -177,6 +237,7 @@ class Goods:
 class CustomsDeclaration:
     """
     Readonly representation of the customs declaration with information about truck, company, products and route.
+    Total price of the goods is calculated once at the creation.
     """
     brand: str
     number: str
@@ -186,50 +247,268 @@ class CustomsDeclaration:
     destination: str
     carriage_contract: bool
     goods: list[Goods] = field(default_factory=list)
+    total: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'total', sum(product.price for product in self.goods))
+
+
+@dataclass(frozen=True)
+class RowError:
+    """
+    Readonly information about the row of the source that could not be loaded.
+    """
+    LINE_NOTE = 'Line {0} of the source'
+
+    line: int
+    row: tuple[str, ...]
+    message: str
+    kind: type[BaseException]
+
+    def exception(self) -> BaseException:
+        """
+        Creates the exception of the row without validating it again.
+
+        :returns: exception of the same type and message as the validation raised, noted with the line.
+        """
+        error = self.kind.__new__(self.kind, self.message)
+        error.add_note(self.LINE_NOTE.format(self.line))
+        return error
+
+
+@dataclass
+class PriceAggregate:
+    """
+    Running statistics of the product prices that passed the customs.
+    """
+    total: float = 0.0
+    count: int = 0
+    minimum: float = float('inf')
+    maximum: float = float('-inf')
+
+    def add(self, price: float):
+        """
+        Adds price to the statistics.
+
+        :param price: price of the product.
+        """
+        self.total += price
+        self.count += 1
+        if price < self.minimum:
+            self.minimum = price
+        if price > self.maximum:
+            self.maximum = price
 
 
 class Customs:
     """
     Provides access to the customs management.
+
+    Declarations are loaded into the trucks list by default, the first invalid row stops the loading
+    unless errors are collected. With several processes the source is split into byte ranges
+    that are validated in parallel, errors are handled the same way.
+    In the streaming mode declarations are read one by one and put into the queues directly,
+    invalid rows are always skipped and saved into errors. Streaming does not bound the memory:
+    declarations stay in the queues and in the passed trucks of the dispatcher, and the source
+    is read once more to size the queues.
     """
     FILE_SOURCE = "trucks.csv"
+    READ_CHUNK_SIZE = 1 << 20
+    PARALLEL_CHUNK_SIZE = 1 << 22
+    DATE_CACHE_SIZE = 4096
     CHARS_TO_REMOVE = '\n '
     FALSE_VALUES = ['f', "false", '0']
     NUMBER_VALIDATOR = compile(r'\D{2}\d{4}\D{2}')
-    DATE_VALIDATOR = compile(r'\d{2}/\d{2}/\d{4}')
     CONTRACT_VALIDATOR = compile(r'f|(false)|0|t|(true)|1')
     PRICE_VALIDATOR = compile(r'\d*\.d{0,2}')
+    ROW_ERRORS = (TruckNumberNotValidException, DateNotValidException, ContractNotValidException,
+                  PriceNotValidException, ValueError, IndexError)
 
-    def __init__(self):
+    def __init__(self, streaming: bool = False, source: str = FILE_SOURCE, processes: int = 1,
+                 collect_errors: bool = False):
+        self.source = source
         self.trucks: list[CustomsDeclaration] = []
-        self.load_trucks()
-        self.common_queue = Queue(len(self.trucks))
-        self.green_queue = Queue(len(self.trucks))
+        self.errors: list[RowError] = []
+        if streaming:
+            capacity = max(self.count_rows(source), 1)
+            self.common_queue = Queue(capacity)
+            self.green_queue = Queue(capacity)
+            self.declared = self.stream_trucks()
+            return
+        if processes > 1:
+            self.load_trucks_parallel(processes, collect_errors=collect_errors)
+        else:
+            self.load_trucks(collect_errors)
+        self.declared = len(self.trucks)
+        self.common_queue = Queue(max(self.declared, 1))
+        self.green_queue = Queue(max(self.declared, 1))
 
     def __iter__(self):
         return CustomsDispatcher(self)
 
-    def load_trucks(self):
+    def load_trucks(self, collect_errors: bool = False):
+        """
+        Loads trucks from the source file (trucks.csv by default).
+
+        :param collect_errors: True - invalid rows are skipped and saved into errors.
+        :raises TruckNumberNotValidException, DateNotValidException, ContractNotValidException,
+                PriceNotValidException: row of the source is not valid and errors are not collected.
+        """
+        self.errors.clear()
+        self.trucks.extend(self.read_declarations(self.source, self.errors if collect_errors else None))
+
+    def load_trucks_parallel(self, processes: int, chunk_size: int = PARALLEL_CHUNK_SIZE,
+                             collect_errors: bool = False):
+        """
+        Loads trucks from the source file in the worker processes.
+        Declarations and errors are kept in the order of the file.
+        Rows must not contain line breaks inside the quoted values.
+
+        :param processes: amount of the worker processes.
+        :param chunk_size: approximate amount of the bytes validated by the worker at once.
+        :param collect_errors: True - invalid rows are skipped and saved into errors.
+        :raises TruckNumberNotValidException, DateNotValidException, ContractNotValidException,
+                PriceNotValidException: row of the source is not valid and errors are not collected,
+                the first invalid row of the file is raised with the same type, message and line as load_trucks does.
+        """
+        self.errors.clear()
+        lines = 1
+        with ProcessPoolExecutor(processes) as executor:
+            for declarations, errors, chunk_lines in executor.map(Customs.load_range, repeat(self.source),
+                                                                  self.split_ranges(self.source, chunk_size)):
+                if errors and not collect_errors:
+                    executor.shutdown(cancel_futures=True)
+                    raise replace(errors[0], line=errors[0].line + lines).exception()
+                self.trucks.extend(declarations)
+                self.errors.extend(replace(error, line=error.line + lines) for error in errors)
+                lines += chunk_lines
+
+    @classmethod
+    def split_ranges(cls, source: str, chunk_size: int) -> list[tuple[int, int]]:
+        """
+        Splits the source after the header into byte ranges that start and end on the line boundaries.
+
+        :param source: path to the csv file with the header.
+        :param chunk_size: approximate size of the range.
+        :returns: list of the ranges [start, end).
+        """
+        size = getsize(source)
+        ranges = []
+        with open(source, 'rb') as file:
+            file.readline()
+            start = file.tell()
+            while start < size:
+                file.seek(min(start + chunk_size, size))
+                file.readline()
+                end = min(max(file.tell(), start + 1), size)
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    @classmethod
+    def load_range(cls, source: str, byte_range: tuple[int, int]):
+        """
+        Validates rows of the source range in the worker process.
+
+        :param source: path to the csv file.
+        :param byte_range: range [start, end) of the rows.
+        :returns: declarations, errors with the line numbers inside the range and amount of the lines in the range.
+        """
+        start, end = byte_range
+        with open(source, 'rb') as file:
+            file.seek(start)
+            text = file.read(end - start).decode('utf-8')
+        errors = []
+        declarations = list(cls.parse_rows(csv.reader(StringIO(text, newline=''), skipinitialspace=True), errors))
+        return declarations, errors, text.count('\n')
+
+    def stream_trucks(self) -> int:
+        """
+        Reads declarations from the source one by one and puts them into the queues.
+        If declaration has carriage contract - to the green queue. Otherwise - to the common.
+        Invalid rows are saved into errors.
+
+        :returns: amount of the loaded declarations.
+        """
+        self.errors.clear()
+        amount = 0
+        for declaration in self.read_declarations(self.source, self.errors):
+            (self.green_queue if declaration.carriage_contract else self.common_queue).into(declaration)
+            amount += 1
+        return amount
+
+    @classmethod
+    def count_rows(cls, source: str) -> int:
+        """
+        Counts lines of the source without decoding it.
+
+        :param source: path to the csv file.
+        :returns: amount of the lines after the header.
         """
-        Loads trucks from file (trucks.csv).
+        lines, last = 0, b'\n'
+        with open(source, 'rb') as file:
+            for chunk in iter(lambda: file.read(cls.READ_CHUNK_SIZE), b''):
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+        return lines + (last != b'\n') - 1
+
+    @classmethod
+    def read_declarations(cls, source: str, errors: list[RowError] | None = None):
         """
-        with open(self.FILE_SOURCE, encoding='utf-8') as source:
-            truck_information = [line.strip(self.CHARS_TO_REMOVE)
-                                 for line in source.readlines()[1:]
-                                 if line.strip(self.CHARS_TO_REMOVE) != '']
+        Reads declarations from the csv file one by one.
+        Values that contain commas or quotes must be quoted, as csv format requires.
 
-        for info in truck_information:
-            brand, number, company, customs_date, city_from, destination, contract, *goods = \
-                map(lambda x: x.strip(self.CHARS_TO_REMOVE), info.split(','))
+        :param source: path to the csv file with the header.
+        :param errors: list to save invalid rows into, None - invalid row stops the reading.
+        :raises TruckNumberNotValidException, DateNotValidException, ContractNotValidException,
+                PriceNotValidException: row is not valid and errors are not collected.
+        :returns: generator of the declarations.
+        """
+        with open(source, encoding='utf-8', newline='') as file:
+            reader = csv.reader(file, skipinitialspace=True)
+            next(reader, None)
+            yield from cls.parse_rows(reader, errors)
+
+    @classmethod
+    def parse_rows(cls, reader, errors: list[RowError] | None = None):
+        """
+        Validates rows of the csv reader one by one.
+
+        :param reader: csv reader of the rows.
+        :param errors: list to save invalid rows into, None - invalid row stops the reading.
+        :raises TruckNumberNotValidException, DateNotValidException, ContractNotValidException,
+                PriceNotValidException: row is not valid and errors are not collected, noted with the line.
+        :returns: generator of the declarations.
+        """
+        for row in reader:
+            if not any(value.strip(cls.CHARS_TO_REMOVE) for value in row):
+                continue
+            try:
+                yield cls.parse_row(row)
+            except cls.ROW_ERRORS as error:
+                if errors is None:
+                    error.add_note(RowError.LINE_NOTE.format(reader.line_num))
+                    raise
+                errors.append(RowError(reader.line_num, tuple(row), str(error), type(error)))
+
+    @classmethod
+    def parse_row(cls, row: list[str]) -> CustomsDeclaration:
+        """
+        Validates values of the csv row and creates declaration.
 
-            number = self.validate_number(number)
-            customs_date = self.validate_date(customs_date)
-            contract = self.validate_contract(contract.lower())
-            goods = self.parse_goods(goods)
-            self.trucks.append(CustomsDeclaration(brand, number, company, customs_date, city_from,
-                                                  destination, contract, goods))
+        :param row: values of the row.
+        :raises TruckNumberNotValidException, DateNotValidException, ContractNotValidException,
+                PriceNotValidException, ValueError: row is not valid.
+        :returns: declaration of the row.
+        """
+        brand, number, company, customs_date, city_from, destination, contract, *goods = \
+            [value.strip(cls.CHARS_TO_REMOVE) for value in row]
+        return CustomsDeclaration(brand, cls.validate_number(number), company, cls.validate_date(customs_date),
+                                  city_from, destination, cls.validate_contract(contract.lower()),
+                                  cls.parse_goods(goods))
 
-    def validate_number(self, number: str):
+    @classmethod
+    def validate_number(cls, number: str):
         """
         Validates and format truck number.
 
@@ -237,23 +516,45 @@ class Customs:
         :raise TruckNumberNotValidException: number does not match the format LLDDDDLL.
         :returns: Validated and upper string of the valid number.
         """
-        if self.NUMBER_VALIDATOR.match(number):
+        if cls.NUMBER_VALIDATOR.match(number):
             return number.upper()
         raise TruckNumberNotValidException(number)
 
-    def validate_date(self, validate_date: str):
+    @classmethod
+    def validate_date(cls, validate_date: str):
         """
         Validates and converts date.
 
         :param validate_date: string value of the date to validate and convert.
         :raises DateNotValidException: date does not match the format %d/%m/%Y.
+        :raises ValueError: day or month is out of range.
         :returns: date converted from the string in %d/%m/%Y format.
         """
-        if self.DATE_VALIDATOR.match(validate_date):
-            return datetime.strptime(validate_date, '%d/%m/%Y').date()
-        raise DateNotValidException(validate_date)
+        result = cls.parse_date(validate_date)
+        if result is None:
+            raise DateNotValidException(validate_date)
+        return result
 
-    def validate_contract(self, contract: str):
+    @staticmethod
+    @lru_cache(maxsize=DATE_CACHE_SIZE)
+    def parse_date(value: str) -> date | None:
+        """
+        Converts date in dd/mm/yyyy format, results are cached since the same dates repeat a lot.
+
+        :param value: string value of the date.
+        :raises ValueError: day or month is out of range.
+        :returns: converted date, None - value is not in dd/mm/yyyy format.
+        """
+        if len(value) != 10 or value[2] != '/' or value[5] != '/':
+            return None
+        day, month, year = value[:2], value[3:5], value[6:]
+        if not (day.isdigit() and month.isdigit() and year.isdigit() and day.isascii() and month.isascii()
+                and year.isascii()):
+            return None
+        return date(int(year), int(month), int(day))
+
+    @classmethod
+    def validate_contract(cls, contract: str):
         """
         Validates and converts to bool contract value.
 
@@ -261,11 +562,12 @@ class Customs:
         :raises ContractNotValidException: contract value must be one of the strings: [f, false, 0, t, true, 1].
         :returns: True - if contact is t, true or 1. False - otherwise.
         """
-        if self.CONTRACT_VALIDATOR.match(contract):
-            return False if contract in self.FALSE_VALUES else True
+        if cls.CONTRACT_VALIDATOR.match(contract):
+            return False if contract in cls.FALSE_VALUES else True
         raise ContractNotValidException(contract)
 
-    def validate_price(self, price: str):
+    @classmethod
+    def validate_price(cls, price: str):
         """
         Validates and converts price value.
 
@@ -273,18 +575,19 @@ class Customs:
         :returns: float value of the price.
         :raises PriceNotValidException: price must be positive floating point value like 0.0, 12.0, 15000.31
         """
-        if self.PRICE_VALIDATOR.match(price):
+        if cls.PRICE_VALIDATOR.match(price):
             return float(price)
         raise PriceNotValidException(price)
 
-    def parse_goods(self, goods: list[str]):
+    @classmethod
+    def parse_goods(cls, goods: list[str]):
         """
         Parses information about products that are delivering.
 
         :param goods: list of the values of the products.
         :returns: list of goods.
         """
-        return [Goods(g[0], self.validate_price(g[1])) for g in [goods[i: i + 2] for i in range(0, len(goods), 2)]]
+        return [Goods(g[0], cls.validate_price(g[1])) for g in [goods[i: i + 2] for i in range(0, len(goods), 2)]]
 
 
 class CustomsDispatcher:
@@ -299,6 +602,7 @@ class CustomsDispatcher:
     TRUCK_REMOVED_DATE_EXPIRED = "Truck {0} with number {1} can not pass the customs due date expiration:" \
                                  "\nToday: {2:%d/%m/%Y}\nDate: {3:%d/%m/%Y}"
     MAX_SUM_RESPONSE = "Truck {0} with number {1} has transported goods for sum {2:.2f}."
+    NO_ONE_PASSED = "There is no truck that passed the customs."
     TRANSPORTED_GOODS = "Trucks:\n{0}\nhave transported '{1}'."
     NO_ONE_TRANSPORTED = "There is no truck that transported {0}."
     GOES_TO = "Trucks going to {0}:\n{1}."
@@ -306,16 +610,24 @@ class CustomsDispatcher:
     GOES_FROM = "Trucks going from {0}:\n{1}."
     NO_ONE_GOES_FROM = "There is no truck that goes from the {0}."
     TRUCK_TRANSPORTED_GOODS = "{0} with number {1}"
-    TITLE_FORMAT = '|{0:^20}|{1:^20}|'
-    TABLE_FORMAT = '|{0:^20}|{1:^20.2f}|'
+    TITLE_FORMAT = '|{0:^20}|{1:^20}|{2:^10}|{3:^20}|{4:^20}|'
+    TABLE_FORMAT = '|{0:^20}|{1:^20.2f}|{2:^10}|{3:^20.2f}|{4:^20.2f}|'
     PRICE_BOUND = 15_000
+    TOP_SIZE = 100
     RESPONSE_SEPARATOR = f"\n{'=' * 100}\n"
     HISTORY = ""
 
     def __init__(self, customs: Customs):
         self.source = customs
-        self.passed_trucks = Queue(self.trucks)
-        self.current = -1
+        self.passed_trucks = Queue(max(self.trucks, 1))
+        self.passed_amount = 0
+        self.product_index: dict[str, dict[int, CustomsDeclaration]] = {}
+        self.destination_index: dict[str, dict[int, CustomsDeclaration]] = {}
+        self.origin_index: dict[str, dict[int, CustomsDeclaration]] = {}
+        self.top_trucks: list[tuple[float, int, CustomsDeclaration]] = []
+        self.prices: dict[str, PriceAggregate] = {}
+        self.rendered_price_table: str | None = None
+        self.current = 0
 
     def __enter__(self):
         self.form_queues()
@@ -330,7 +642,7 @@ class CustomsDispatcher:
         return self
 
     def __next__(self):
-        if self.current >= self.trucks:
+        if self.current >= len(self.source.trucks):
             raise StopIteration()
         result = self.source.trucks[self.current]
         self.current += 1
@@ -364,9 +676,9 @@ class CustomsDispatcher:
         """
         Gets amount of the trucks.
 
-        :returns: amount of the trucks records.
+        :returns: amount of the trucks declarations.
         """
-        return len(self.source.trucks)
+        return self.source.declared
 
     def save_session(self):
         """
@@ -403,6 +715,102 @@ class CustomsDispatcher:
             item = self.source.common_queue.take()
             self.manage_common_queue(item)
 
+    def pass_truck(self, declaration: CustomsDeclaration):
+        """
+        Adds truck to the passed trucks and to the indexes by product title, destination and start city.
+        Indexes keep declarations by the order of passing, cities are casefolded.
+
+        :param declaration: data for the customs transportations.
+        """
+        position = self.passed_amount
+        self.passed_trucks.into(declaration)
+        self.passed_amount += 1
+        for product in declaration.goods:
+            self.product_index.setdefault(product.title, {})[position] = declaration
+        self.destination_index.setdefault(declaration.destination.casefold(), {})[position] = declaration
+        self.origin_index.setdefault(declaration.city_from.casefold(), {})[position] = declaration
+
+        for product in declaration.goods:
+            aggregate = self.prices.get(product.title)
+            if aggregate is None:
+                aggregate = self.prices[product.title] = PriceAggregate()
+            aggregate.add(product.price)
+        self.rendered_price_table = None
+
+        # Min-heap of the TOP_SIZE most expensive trucks, earlier truck wins the tie.
+        item = (declaration.total, -position, declaration)
+        if len(self.top_trucks) < self.TOP_SIZE:
+            heappush(self.top_trucks, item)
+        elif item[:2] > self.top_trucks[0][:2]:
+            heapreplace(self.top_trucks, item)
+
+    def top(self, amount: int = 1) -> list[CustomsDeclaration]:
+        """
+        Gets the most expensive passed trucks.
+
+        :param amount: amount of the trucks, up to TOP_SIZE is answered from the heap.
+        :returns: declarations from the most expensive one, earlier truck goes first for the same total.
+        """
+        if amount <= len(self.top_trucks) or len(self.top_trucks) == self.passed_amount:
+            return [declaration for *_, declaration in nlargest(amount, self.top_trucks, key=lambda x: x[:2])]
+        return nlargest(amount, self.passed_trucks.source, key=lambda declaration: declaration.total)
+
+    def prices_snapshot(self) -> dict[str, PriceAggregate]:
+        """
+        Gets copy of the price statistics of the products passed since the last reset.
+
+        :returns: statistics by the product title.
+        """
+        return {title: replace(aggregate) for title, aggregate in self.prices.items()}
+
+    def reset_prices(self) -> dict[str, PriceAggregate]:
+        """
+        Starts new shift of the price statistics.
+
+        :returns: statistics of the finished shift by the product title.
+        """
+        snapshot, self.prices = self.prices, {}
+        self.rendered_price_table = None
+        return snapshot
+
+    def render_price_table(self) -> str:
+        """
+        Formats price statistics into the table, table is formatted again only after new truck has passed.
+        Unlike price_table it is not traced, so it may be polled without growing the history.
+
+        :returns: Formatted table with name of the product, its total price, amount, minimum and maximum prices.
+        """
+        if self.rendered_price_table is None:
+            self.rendered_price_table = self.TITLE_FORMAT.format('Title', 'Price', 'Count', 'Minimum', 'Maximum') + \
+                '\n' + '\n'.join(self.TABLE_FORMAT.format(title, aggregate.total, aggregate.count, aggregate.minimum,
+                                                          aggregate.maximum)
+                                 for title, aggregate in self.prices.items())
+        return self.rendered_price_table
+
+    def query(self, product: str | None = None, city_from: str | None = None,
+              city_to: str | None = None) -> list[CustomsDeclaration]:
+        """
+        Finds passed trucks that match all set conditions, intersecting the smallest index with the others.
+
+        :param product: title of the transported product.
+        :param city_from: city of the truck start point, case insensitive.
+        :param city_to: city of the truck destination, case insensitive.
+        :returns: declarations in the order of passing, all passed trucks if no condition is set.
+        """
+        selected = []
+        if product is not None:
+            selected.append(self.product_index.get(product, {}))
+        if city_from is not None:
+            selected.append(self.origin_index.get(city_from.casefold(), {}))
+        if city_to is not None:
+            selected.append(self.destination_index.get(city_to.casefold(), {}))
+        if not selected:
+            return list(self.passed_trucks.source)
+
+        smallest = min(selected, key=len)
+        return [declaration for position, declaration in smallest.items()
+                if all(position in index for index in selected)]
+
     @trace
     def add_to_queue(self, declaration: CustomsDeclaration):
         """
@@ -431,14 +839,14 @@ class CustomsDispatcher:
         :param declaration: data for the customs transportations.
         :returns: action response.
         """
-        total_sum = sum([product.price for product in declaration.goods])
+        total_sum = declaration.total
         if total_sum >= self.PRICE_BOUND:
             self.source.common_queue.into(declaration)
             return self.CHANGED_QUEUE_DUE_TO_PRICE.format(declaration.brand, declaration.number, total_sum)
         if declaration.date < datetime.now().date():
             return self.TRUCK_REMOVED_DATE_EXPIRED.format(declaration.brand, declaration.number, datetime.now().date(),
                                                           declaration.date)
-        self.passed_trucks.into(declaration)
+        self.pass_truck(declaration)
         return self.TRUCK_PASSED.format(declaration.brand, declaration.number, datetime.now().date())
 
     @trace
@@ -454,7 +862,7 @@ class CustomsDispatcher:
         if declaration.date < datetime.now().date():
             return self.TRUCK_REMOVED_DATE_EXPIRED.format(declaration.brand, declaration.number, datetime.now().date(),
                                                           declaration.date)
-        self.passed_trucks.into(declaration)
+        self.pass_truck(declaration)
         return self.TRUCK_PASSED.format(declaration.brand, declaration.number, datetime.now().date())
 
     @trace
@@ -464,12 +872,23 @@ class CustomsDispatcher:
 
         :returns: Formatted result.
         """
-        max_sum, result = 0, None
-        for truck in self.passed_trucks.source:
-            current_sum = sum([product.price for product in truck.goods])
-            if current_sum > max_sum:
-                max_sum, result = current_sum, truck
-        return self.MAX_SUM_RESPONSE.format(result.brand, result.number, max_sum)
+        if not self.top_trucks:
+            return self.NO_ONE_PASSED
+        result = self.top()[0]
+        return self.MAX_SUM_RESPONSE.format(result.brand, result.number, result.total)
+
+    @trace
+    def top_transported_prices(self, amount: int):
+        """
+        Finds trucks with the products for the maximum prices.
+
+        :param amount: amount of the trucks.
+        :returns: Formatted result.
+        """
+        if not self.top_trucks:
+            return self.NO_ONE_PASSED
+        return '\n'.join(self.MAX_SUM_RESPONSE.format(truck.brand, truck.number, truck.total)
+                         for truck in self.top(amount))
 
     @trace
     def transported(self, product: str):
@@ -479,7 +898,7 @@ class CustomsDispatcher:
         :param product: name of the product to transport.
         :returns: Formatted response, including 'not found' case.
         """
-        filtered = self.passed_trucks.filter(lambda x: product in [p.title for p in x.goods])
+        filtered = self.query(product=product)
         return self.TRANSPORTED_GOODS.format('\n'.join(self.TRUCK_TRANSPORTED_GOODS.format(truck.brand, truck.number)
                                                        for truck in filtered), product) if filtered \
             else self.NO_ONE_TRANSPORTED.format(product)
@@ -492,7 +911,7 @@ class CustomsDispatcher:
         :param city_to: city of the truck destination.
         :returns: Formatted response, including 'not found' case.
         """
-        filtered = self.passed_trucks.filter(lambda x: x.destination.lower() == city_to.lower())
+        filtered = self.query(city_to=city_to)
         return self.GOES_TO.format(city_to, '\n'.join(self.TRUCK_TRANSPORTED_GOODS.format(truck.brand,
                                                                                           truck.number)
                                                       for truck in filtered)) if filtered \
@@ -506,7 +925,7 @@ class CustomsDispatcher:
         :param city_from: city of the truck start point.
         :returns: Formatted response, including 'not found' case.
         """
-        filtered = self.passed_trucks.filter(lambda x: x.city_from.lower() == city_from.lower())
+        filtered = self.query(city_from=city_from)
         return self.GOES_FROM.format(city_from, '\n'.join(self.TRUCK_TRANSPORTED_GOODS.format(truck.brand,
                                                                                               truck.number)
                                                           for truck in filtered)) if filtered \
@@ -515,18 +934,231 @@ class CustomsDispatcher:
     @trace
     def price_table(self):
         """
-        Calculate sum of the products, that were delivered through the customs.
+        Calculate sum of the products, that were delivered through the customs since the last reset of the prices.
+        Every call is saved into the history, use render_price_table to poll the table.
 
-        :returns: Formatted table with name of the product and its price.
+        :returns: Formatted table with name of the product, its total price, amount, minimum and maximum prices.
         """
-        table = {}
-        for truck in self.passed_trucks.source:
-            for goods in truck.goods:
-                if goods.title not in table:
-                    table[goods.title] = 0
-                table[goods.title] += goods.price
-        return self.TITLE_FORMAT.format('Title', 'Price') + '\n' + '\n'.join(self.TABLE_FORMAT.format(key, value)
-                                                                             for key, value in table.items())
+        return self.render_price_table()
+
+
+@dataclass(frozen=True)
+class SimulationReport:
+    """
+    Readonly result of the customs simulation, times are in minutes.
+    Overflowed trucks arrived to the full queue and left without passing.
+    """
+    passed: int
+    rerouted: int
+    overflowed: int
+    duration: float
+    waiting: dict[str, float]
+    latency: dict[str, float]
+    utilisation: dict[str, float]
+
+    def __str__(self):
+        return f'Passed: {self.passed}, rerouted to the common queue: {self.rerouted}, ' \
+               f'overflowed: {self.overflowed}, duration: {self.duration:.2f} min\n' + \
+            '\n'.join(f'{title}: ' + ', '.join(f'{key} {value:.2f}' for key, value in values.items())
+                      for title, values in (('Waiting', self.waiting), ('Latency', self.latency),
+                                            ('Utilisation', self.utilisation)))
+
+
+class CustomsSimulation:
+    """
+    Discrete-event simulation of the customs with several lanes for the green and the common queues.
+    Trucks with carriage contract arrive to the green queue, the rest - to the common one.
+    Green lane sends truck to the common queue if reroute rule is true for it, that takes reroute_time.
+    Events are kept in the heap by time, arrivals are read lazily in the order of time.
+    Truck that arrives or is rerouted to the full queue leaves and is counted as overflowed.
+
+    GREEN, COMMON - names of the queues.
+    PERCENTILES - reported percentiles of the waiting and the latency.
+    QUEUE_CAPACITY - default capacity of the queues.
+    ARRIVAL, FINISH - kinds of the events, truck arrival and end of the service in the lane.
+    """
+    GREEN, COMMON = 'green', 'common'
+    PERCENTILES = (50, 90, 99)
+    QUEUE_CAPACITY = 1_000_000
+    ARRIVAL, FINISH = 0, 1
+
+    def __init__(self, green_lanes: int = 1, common_lanes: int = 1,
+                 green_service=None, common_service=None, reroute=None, reroute_time: float = 0.0,
+                 capacity: int = QUEUE_CAPACITY):
+        """
+        :param green_lanes: amount of the lanes of the green queue.
+        :param common_lanes: amount of the lanes of the common queue.
+        :param green_service: function of the declaration that returns service time in the green lane.
+        :param common_service: function of the declaration that returns service time in the common lane.
+        :param reroute: function of the declaration, True - truck is sent from the green to the common queue.
+                        Total price over CustomsDispatcher.PRICE_BOUND by default.
+        :param reroute_time: time that green lane spends on the rerouted truck.
+        :param capacity: capacity of the queues.
+        """
+        if green_lanes <= 0 or common_lanes <= 0:
+            raise ValueError("Amount of the lanes can not be less or equal zero")
+        self.lanes = {self.GREEN: green_lanes, self.COMMON: common_lanes}
+        self.service = {self.GREEN: green_service or self.exponential(5.0),
+                        self.COMMON: common_service or self.exponential(15.0)}
+        self.reroute = reroute or (lambda declaration: declaration.total >= CustomsDispatcher.PRICE_BOUND)
+        self.reroute_time = reroute_time
+        self.capacity = capacity
+
+    @staticmethod
+    def exponential(mean: float, seed: int | None = None):
+        """
+        Creates exponentially distributed service time.
+
+        :param mean: mean service time.
+        :param seed: seed of the random generator.
+        :returns: function of the declaration that returns service time.
+        """
+        generator = random.Random(seed)
+        return lambda declaration: generator.expovariate(1 / mean)
+
+    @staticmethod
+    def uniform(low: float, high: float, seed: int | None = None):
+        """
+        Creates uniformly distributed service time.
+
+        :param low: minimum service time.
+        :param high: maximum service time.
+        :param seed: seed of the random generator.
+        :returns: function of the declaration that returns service time.
+        """
+        generator = random.Random(seed)
+        return lambda declaration: generator.uniform(low, high)
+
+    @staticmethod
+    def poisson_arrivals(declarations: list[CustomsDeclaration], per_hour: float, hours: float,
+                         seed: int | None = None):
+        """
+        Generates arrivals with exponential intervals, declarations are repeated in cycle.
+
+        :param declarations: declarations of the arriving trucks.
+        :param per_hour: mean amount of the arrivals per hour.
+        :param hours: time of the arrivals in hours.
+        :param seed: seed of the random generator.
+        :returns: generator of the arrival time in minutes, as the simulation counts it, and the declaration.
+        """
+        generator = random.Random(seed)
+        time = generator.expovariate(per_hour)
+        for declaration in cycle(declarations):
+            if time > hours:
+                return
+            yield time * 60, declaration
+            time += generator.expovariate(per_hour)
+
+    @classmethod
+    def percentiles(cls, values: list[float]) -> dict[str, float]:
+        """
+        Calculates nearest-rank percentiles.
+
+        :param values: measured values.
+        :returns: PERCENTILES and maximum by the name, zeros for no values.
+        """
+        if not values:
+            return {**{f'p{percent}': 0.0 for percent in cls.PERCENTILES}, 'max': 0.0}
+        values = sorted(values)
+        result = {f'p{percent}': values[max(-(-len(values) * percent // 100) - 1, 0)] for percent in cls.PERCENTILES}
+        result['max'] = values[-1]
+        return result
+
+    def run(self, arrivals) -> SimulationReport:
+        """
+        Simulates the customs.
+
+        :param arrivals: iterable of the arrival time and the declaration in the order of time.
+        :raises ValueError: arrival is earlier than the previous one.
+        :returns: report of the waiting and the latency by the queue, utilisation of the lanes
+                  and amount of the trucks that left the full queues.
+        """
+        queues = {self.GREEN: Queue(self.capacity), self.COMMON: Queue(self.capacity)}
+        free_lanes = {name: list(range(amount)) for name, amount in self.lanes.items()}
+        busy = {name: [0.0] * amount for name, amount in self.lanes.items()}
+        waiting = {self.GREEN: [], self.COMMON: []}
+        latency = {self.GREEN: [], self.COMMON: []}
+        events, sequence, rerouted, overflowed, now, last_arrival = [], 0, 0, 0, 0.0, float('-inf')
+        arrivals = iter(arrivals)
+
+        def schedule_arrival():
+            nonlocal sequence, last_arrival
+            arrival = next(arrivals, None)
+            if arrival is not None:
+                if arrival[0] < last_arrival:
+                    raise ValueError("Arrivals must be in the order of time")
+                last_arrival = arrival[0]
+                heappush(events, (arrival[0], sequence, self.ARRIVAL, arrival))
+                sequence += 1
+
+        def enqueue(name: str, item: tuple):
+            nonlocal overflowed
+            if queues[name].is_full:
+                overflowed += 1
+                return
+            queues[name].into(item)
+            start_service(name)
+
+        def start_service(name: str):
+            nonlocal sequence, rerouted
+            queue, lanes = queues[name], free_lanes[name]
+            while lanes and queue:
+                arrived, declaration, entered = queue.take()
+                lane = lanes.pop()
+                waiting[name].append(now - entered)
+                is_rerouted = name == self.GREEN and self.reroute(declaration)
+                if is_rerouted:
+                    rerouted += 1
+                    duration = self.reroute_time
+                else:
+                    duration = self.service[name](declaration)
+                busy[name][lane] += duration
+                heappush(events, (now + duration, sequence, self.FINISH, (name, lane, is_rerouted, arrived,
+                                                                          declaration)))
+                sequence += 1
+
+        schedule_arrival()
+        while events:
+            now, _, kind, payload = heappop(events)
+            if kind == self.ARRIVAL:
+                arrived, declaration = payload
+                name = self.GREEN if declaration.carriage_contract else self.COMMON
+                enqueue(name, (arrived, declaration, arrived))
+                schedule_arrival()
+                continue
+
+            name, lane, is_rerouted, arrived, declaration = payload
+            free_lanes[name].append(lane)
+            if is_rerouted:
+                enqueue(self.COMMON, (arrived, declaration, now))
+            else:
+                latency[name].append(now - arrived)
+            start_service(name)
+
+        return SimulationReport(len(latency[self.GREEN]) + len(latency[self.COMMON]), rerouted, overflowed, now,
+                                {f'{name} {key}': value for name in waiting
+                                 for key, value in self.percentiles(waiting[name]).items()},
+                                {f'{name} {key}': value for name in latency
+                                 for key, value in self.percentiles(latency[name]).items()},
+                                {f'{name} {lane}': time / now if now else 0.0 for name in busy
+                                 for lane, time in enumerate(busy[name])})
+
+    @classmethod
+    def benchmark(cls, declarations: list[CustomsDeclaration], days: int = 365, per_hour: float = 30,
+                  seed: int = 0) -> tuple[SimulationReport, float]:
+        """
+        Simulates traffic of the set amount of days with two green and four common lanes.
+
+        :param declarations: declarations of the arriving trucks.
+        :param days: simulated days.
+        :param per_hour: mean amount of the arrivals per hour.
+        :param seed: seed of the random generators, each random stream gets its own seed derived from it.
+        :returns: report and seconds of the simulation.
+        """
+        simulation = cls(2, 4, cls.exponential(3.0, seed + 1), cls.uniform(5.0, 10.0, seed + 2), reroute_time=1.0)
+        start = perf_counter()
+        report = simulation.run(cls.poisson_arrivals(declarations, per_hour, days * 24, seed))
+        return report, perf_counter() - start
 
 
 class CustomsDataGenerator:
@@ -685,6 +1317,209 @@ class CustomsDataGenerator:
             file.write('\n' + '\n'.join(lines))
 
 
+def benchmark_queue(amount: int = 1_000_000, list_amount: int = 20_000) -> dict[str, float]:
+    """
+    Measures passing of the declarations through the queue and through the list with removing the first element.
+
+    :param amount: amount of the declarations passed through the queue.
+    :param list_amount: amount of the declarations passed through the list, it is quadratic so it is smaller.
+    :returns: microseconds per declaration by the name of the structure.
+    """
+    declaration = CustomsDeclaration('Daf', 'AA0000BB', 'Cargo', date(2022, 10, 16), 'Lviv', 'Graz', True,
+                                     [Goods('Salt', 12.5)])
+    declarations = [declaration] * amount
+    results = {}
+
+    queue = Queue(amount)
+    start = perf_counter()
+    for item in declarations:
+        queue.into(item)
+    while queue:
+        queue.take()
+    results['Queue'] = (perf_counter() - start) / amount * 1e6
+
+    storage = []
+    start = perf_counter()
+    for item in declarations[:list_amount]:
+        storage.append(item)
+    while storage:
+        storage.remove(storage[0])
+    results['list'] = (perf_counter() - start) / list_amount * 1e6
+    return results
+
+
+class Test(TestCase):
+    """
+    Test class to check the loading and the dispatching of the declarations.
+    """
+    HEADER = 'brand,number,company,date,city from, destination, carriage_contract, goods\n'
+    INVALID_ROWS = 'Kenworth, XY91AR, A7 trans, 23/06/2022, Nürnberg, Berlin, true, Baby care, 257.17\n' \
+                   'Scania, SY5132PS, A7 trans, 04/13/2022, Bordeaux, Algeciras, 0, Honey, 2329.90\n'
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def source(self, rows: str, name: str = 'trucks.csv') -> str:
+        """
+        Writes rows after the header into the temporary csv file.
+        """
+        path = join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(self.HEADER + rows)
+        return path
+
+    def test_customs_OnlyInvalidRows_EmptyDispatcher(self):
+        source = self.source(self.INVALID_ROWS)
+        for name, customs in (('streaming', lambda: Customs(streaming=True, source=source)),
+                              ('collect_errors', lambda: Customs(source=source, collect_errors=True))):
+            with self.subTest(name):
+                customs = customs()
+                dispatcher = CustomsDispatcher(customs)
+                self.assertEqual(customs.declared, 0)
+                self.assertEqual([error.line for error in customs.errors], [2, 3])
+                self.assertEqual(dispatcher.query(), [])
+                self.assertEqual(dispatcher.top(), [])
+
+    def test_customs_ParallelLoading_MatchesSerial(self):
+        CustomsDataGenerator.generate(300, self.source(''))
+        with open(join(self.directory, 'trucks.csv'), encoding='utf-8') as file:
+            lines = file.read().splitlines(keepends=True)
+        valid = ''.join(lines[1:])
+        invalid = self.INVALID_ROWS.splitlines(keepends=True)
+        mixed = ''.join(lines[1:120] + invalid[:1] + lines[120:250] + invalid[1:] + lines[250:])
+        for name, rows in (('valid', valid), ('mixed', mixed), ('invalid', self.INVALID_ROWS)):
+            source = self.source(rows, f'{name}.csv')
+            with self.subTest(f'{name}, collected errors'):
+                serial = Customs(source=source, collect_errors=True)
+                parallel = Customs(source=source, collect_errors=True)
+                parallel.trucks.clear()
+                parallel.load_trucks_parallel(2, chunk_size=1000, collect_errors=True)
+                self.assertEqual(parallel.trucks, serial.trucks)
+                self.assertEqual(parallel.errors, serial.errors)
+            with self.subTest(f'{name}, raised error'):
+                raised = []
+                for load in (lambda customs: customs.load_trucks(),
+                             lambda customs: customs.load_trucks_parallel(2, chunk_size=1000)):
+                    customs = Customs(source=source, collect_errors=True)
+                    customs.trucks.clear()
+                    try:
+                        load(customs)
+                        raised.append(None)
+                    except Customs.ROW_ERRORS as error:
+                        raised.append((type(error), str(error), error.__notes__))
+                self.assertEqual(raised[0], raised[1])
+                self.assertEqual(raised[0] is None, name == 'valid')
+
+    def dispatcher(self, amount: int) -> CustomsDispatcher:
+        """
+        Creates dispatcher with all generated trucks passed regardless of the date and the price.
+        """
+        random.seed(amount)
+        source = self.source('')
+        CustomsDataGenerator.generate(amount, source)
+        dispatcher = CustomsDispatcher(Customs(source=source))
+        for declaration in dispatcher.source.trucks:
+            dispatcher.pass_truck(declaration)
+        return dispatcher
+
+    def test_dispatcher_query_MatchesLinearFilters(self):
+        dispatcher = self.dispatcher(300)
+        passed = list(dispatcher.passed_trucks.source)
+        products = sorted({product.title for truck in passed for product in truck.goods}) + ['Unknown']
+        cities = sorted({truck.city_from for truck in passed} | {truck.destination for truck in passed}) + ['Unknown']
+        for product in products:
+            with self.subTest(f'Product = {product}'):
+                self.assertEqual(dispatcher.query(product=product),
+                                 [truck for truck in passed if product in [p.title for p in truck.goods]])
+        for city in cities + [city.upper() for city in cities]:
+            with self.subTest(f'City = {city}'):
+                self.assertEqual(dispatcher.query(city_from=city),
+                                 [truck for truck in passed if truck.city_from.lower() == city.lower()])
+                self.assertEqual(dispatcher.query(city_to=city),
+                                 [truck for truck in passed if truck.destination.lower() == city.lower()])
+        combinations = [(truck.goods[0].title, truck.city_from.upper(), truck.destination) for truck in passed[:50]]
+        for product, city_from, city_to in combinations + list(zip(products, cities, reversed(cities))):
+            with self.subTest(f'{product} from {city_from} to {city_to}'):
+                self.assertEqual(dispatcher.query(product, city_from, city_to),
+                                 [truck for truck in passed if product in [p.title for p in truck.goods]
+                                  and truck.city_from.lower() == city_from.lower()
+                                  and truck.destination.lower() == city_to.lower()])
+        self.assertEqual(dispatcher.query(), passed)
+
+    def test_dispatcher_top_MatchesNlargestWithTies(self):
+        customs = self.dispatcher(300).source
+        dispatcher = CustomsDispatcher(customs)
+        for index, declaration in enumerate(customs.trucks):
+            dispatcher.pass_truck(replace(declaration, goods=[Goods('Salt', float(index % 7))]))
+        passed = list(dispatcher.passed_trucks.source)
+        for amount in (1, 50, CustomsDispatcher.TOP_SIZE, CustomsDispatcher.TOP_SIZE + 1, 250, 300, 400):
+            with self.subTest(f'Amount = {amount}'):
+                self.assertEqual([id(truck) for truck in dispatcher.top(amount)],
+                                 [id(truck) for truck in nlargest(amount, passed, key=lambda truck: truck.total)])
+
+    def test_dispatcher_renderPriceTable_NotTraced(self):
+        customs = self.dispatcher(3).source
+        dispatcher = CustomsDispatcher(customs)
+        for declaration, price in zip(customs.trucks, (3.5, 1.25, 7.0)):
+            dispatcher.pass_truck(replace(declaration, goods=[Goods('Salt', price)]))
+        history = CustomsDispatcher.HISTORY
+        table = dispatcher.render_price_table()
+        self.assertEqual(CustomsDispatcher.HISTORY, history)
+        self.assertEqual(table.splitlines()[1], CustomsDispatcher.TABLE_FORMAT.format('Salt', 11.75, 3, 1.25, 7.0))
+
+    @staticmethod
+    def declaration(carriage_contract: bool) -> CustomsDeclaration:
+        """
+        Creates declaration of the truck for the green or the common queue.
+        """
+        return CustomsDeclaration('Kenworth', 'XY9171AR', 'A7 trans', date(2022, 6, 23), 'Nürnberg', 'Berlin',
+                                  carriage_contract, [Goods('Salt', 100.0)])
+
+    def test_simulation_percentiles_NearestRank(self):
+        self.assertEqual(CustomsSimulation.percentiles(list(range(100, 0, -1))),
+                         {'p50': 50, 'p90': 90, 'p99': 99, 'max': 100})
+        self.assertEqual(CustomsSimulation.percentiles([0.0, 1.0, 0.0]),
+                         {'p50': 0.0, 'p90': 1.0, 'p99': 1.0, 'max': 1.0})
+        self.assertEqual(CustomsSimulation.percentiles([]), {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0})
+
+    def test_simulation_run_WaitingAndUtilisation(self):
+        common = self.declaration(False)
+        simulation = CustomsSimulation(common_service=lambda declaration: 2.0)
+        report = simulation.run([(0.0, common), (1.0, common), (10.0, common)])
+        self.assertEqual((report.passed, report.rerouted, report.overflowed, report.duration), (3, 0, 0, 12.0))
+        self.assertEqual(report.waiting['common max'], 1.0)
+        self.assertEqual(report.latency['common max'], 3.0)
+        self.assertEqual(report.utilisation, {'green 0': 0.0, 'common 0': 0.5})
+
+    def test_simulation_run_ReroutedToCommonQueue(self):
+        simulation = CustomsSimulation(common_service=lambda declaration: 2.0, reroute=lambda declaration: True,
+                                       reroute_time=1.0)
+        report = simulation.run([(0.0, self.declaration(True))])
+        self.assertEqual((report.passed, report.rerouted, report.overflowed, report.duration), (1, 1, 0, 3.0))
+        self.assertEqual(report.waiting['green max'], 0.0)
+        self.assertEqual(report.latency['green max'], 0.0)
+        self.assertEqual(report.latency['common max'], 3.0)
+        self.assertEqual(report.utilisation, {'green 0': 1 / 3, 'common 0': 2 / 3})
+
+    def test_simulation_run_FullQueue_Overflowed(self):
+        common = self.declaration(False)
+        simulation = CustomsSimulation(common_service=lambda declaration: 10.0, capacity=1)
+        report = simulation.run([(0.0, common), (1.0, common), (2.0, common)])
+        self.assertEqual((report.passed, report.overflowed), (2, 1))
+
+    def test_simulation_run_UnorderedArrivals_ValueError(self):
+        common = self.declaration(False)
+        with self.assertRaises(ValueError):
+            CustomsSimulation().run([(5.0, common), (1.0, common)])
+
+    def test_simulation_poissonArrivals_HoursAndMinutes(self):
+        arrivals = list(CustomsSimulation.poisson_arrivals([self.declaration(False)], 60, 100, seed=1))
+        self.assertTrue(all(time <= 100 * 60 for time, _ in arrivals))
+        self.assertAlmostEqual(len(arrivals) / 6000, 1, delta=0.1)
+
+
 def main():
     # CustomsDataGenerator.generate(20, Customs.FILE_SOURCE)
     with CustomsDispatcher(Customs()) as dispatcher: